@@ -8,6 +8,7 @@
         'security/ir.model.access.csv',
         'data/email_templates.xml',
         'data/eims_sequence.xml',
+        'data/eims_cron.xml',
         'report/eims_invoice_report_templates.xml',
         'report/eims_receipt_report_templates.xml',
         'report/eims_withhold_receipt_report_templates.xml',
@@ -25,6 +26,9 @@
         'views/eims_bulk_cancel.xml',
         'views/eims_bulk_cancel_wizard_view.xml',
         'views/account_move_line_view.xml',
+        'views/account_tax_view.xml',
+        'views/eims_submission_queue_views.xml',
+        'views/eims_bulk_conversation_views.xml',
 
     ],
     'controllers': [
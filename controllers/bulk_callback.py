@@ -1,32 +1,70 @@
-from odoo import http, fields
-from datetime import datetime
+from odoo import http
 from odoo.http import request
+from markupsafe import Markup
 import json
 import logging
 
+from odoo.addons.eims_test_connector_12.services.eims_body_mapper import parse_eims_datetime
+from odoo.addons.eims_test_connector_12.services.json_stream import JSONStreamError, iter_chunks, iter_json_array
+
 _logger = logging.getLogger(__name__)
 
+# Callback items applied per round of mapping/log queries
+CALLBACK_CHUNK_SIZE = 200
+NOTE_EXCLUDED_KEYS = ("signedInvoice", "signedQR")
+
 
 class EIMSBulkCallbackController(http.Controller):
 
     @http.route('/eims/bulk-callback', type='http', auth='public', csrf=False, methods=['POST'])
     def bulk_callback(self, **post):
         # ---------------------------------------------------
-        # 1. PARSE JSON SAFELY
+        # 1. PARSE JSON INCREMENTALLY, ONE CHUNK OF ITEMS AT A TIME
         # ---------------------------------------------------
+        processed_docs = []
+        env = request.env  # use request.env for proper ORM access in controller
+        conversation_id = (
+            request.httprequest.headers.get("ConversationId")
+            or request.httprequest.args.get("conversationId")
+            or ""
+        )
         try:
-            payload = json.loads(request.httprequest.data.decode("utf-8"))
-            _logger.info("📨 Received Bulk EIMS Callback:\n%s", json.dumps(payload, indent=2))
-        except Exception as e:
+            items = iter_json_array(request.httprequest.stream)
+            for chunk in iter_chunks(items, CALLBACK_CHUNK_SIZE):
+                processed_docs += self._process_callback_items(env, chunk, conversation_id)
+                # Applied chunks stay in the inbox: a redelivery skips them
+                env.cr.commit()
+        except JSONStreamError as e:
+            # The chunk being read is dropped, MoR delivers the callback again
+            env.cr.rollback()
             _logger.error("❌ Invalid JSON: %s", e)
             return request.make_response(
                 json.dumps({"message": "Invalid JSON"}),
                 headers=[('Content-Type', 'application/json')],
                 status=400
             )
+        _logger.info("📨 Received Bulk EIMS Callback: %s document(s) processed", len(processed_docs))
+
+        # ---------------------------------------------------
+        # 8. RETURN SUCCESS
+        # ---------------------------------------------------
+        return request.make_response(
+            json.dumps({
+                "message": "Bulk callback processed successfully",
+                "count": len(processed_docs),
+                "documents": processed_docs
+            }),
+            headers=[("Content-Type", "application/json")],
+            status=200
+        )
 
+    def _process_callback_items(self, env, payload, conversation_id=""):
+        """
+        Apply one chunk of callback items; return the acknowledged document
+        numbers. Items already recorded in the callback inbox for their
+        conversation are acknowledged without being applied again.
+        """
         processed_docs = []
-        env = request.env  # use request.env for proper ORM access in controller
         status_mapping = {
             "A": "verified",
             "C": "cancelled",
@@ -35,116 +73,134 @@ class EIMSBulkCallbackController(http.Controller):
         }
 
         # ---------------------------------------------------
-        # 2. PROCESS EACH CALLBACK ITEM
+        # 2. RECORD IN THE INBOX, SKIP DUPLICATE DELIVERIES
         # ---------------------------------------------------
+        Inbox = env['eims.bulk.callback.log'].sudo()
+        items_by_conversation = {}
         for item in payload:
+            doc_no = str(item.get("documentNumber")).strip()
+            conversation = str(item.get("conversationId") or conversation_id)
+            # Compact JSON, stored once and shared by the inbox, the invoice and its log
+            items_by_conversation.setdefault(conversation, {})[doc_no] = (item, json.dumps(item, ensure_ascii=False))
+
+        Mapping = env['eims.bulk.mapping'].sudo()
+        new_items = []
+        for conversation, items in items_by_conversation.items():
+            claimed = Inbox._claim_items(conversation, {
+                doc_no: item_json for doc_no, (item, item_json) in items.items()
+            })
 
-            raw_doc_no = item.get("documentNumber")
-            doc_no = str(raw_doc_no).strip()
-            _logger.info("🔍 Searching mapping for doc_no='%s'", doc_no)
+            # ---------------------------------------------------
+            # 3. RESOLVE THE MAPPINGS OF THE CONVERSATION IN ONE QUERY
+            # ---------------------------------------------------
+            mapping_by_doc = Mapping.resolve([doc_no for doc_no in items if doc_no in claimed],
+                                             conversation=conversation or None)
+            for doc_no, (item, item_json) in items.items():
+                if doc_no in claimed:
+                    new_items.append((doc_no, item, item_json, Inbox.browse(claimed[doc_no]),
+                                      mapping_by_doc.get(doc_no)))
+                else:
+                    processed_docs.append(doc_no)
+        if processed_docs:
+            _logger.info("📨 %s duplicate callback item(s) acknowledged", len(processed_docs))
 
-            mapping = env['eims.bulk.mapping'].sudo().search([
-                ('document_number', '=', doc_no)
-            ], limit=1)
+        # ---------------------------------------------------
+        # 4. SAVE RAW PAYLOAD TO INVOICES
+        # ---------------------------------------------------
+        used_mappings = Mapping
+        items_by_invoice = {}
+        unmatched = Inbox
+        for doc_no, item, item_json, inbox, mapping in new_items:
 
             if not mapping:
                 _logger.warning("⚠ No mapping found for doc_no=%s", doc_no)
+                unmatched |= inbox
                 continue
 
             invoice = mapping.invoice_id
 
             if not invoice:
                 _logger.warning("⚠ Mapping exists but invoice missing for doc_no=%s", doc_no)
+                unmatched |= inbox
                 continue
 
-            # ---------------------------------------------------
-            # 3. SAVE RAW PAYLOAD TO INVOICE
-            # ---------------------------------------------------
             invoice.sudo().write({
-                'eims_bulk_response': json.dumps(item, indent=2),
+                'eims_bulk_response': item_json,
                 'eims_irn': item.get("irn"),
                 'eims_signed_invoice': item.get("signedInvoice"),
                 'eims_qr_code': item.get("signedQR"),
                 'eims_status': status_mapping.get(item.get("status"), "pending"),
             })
+            if item.get("irn"):
+                env['eims.irn.pointer'].sudo()._swap_last_irn(invoice, item.get("irn"))
 
-            # ---------------------------------------------------
-            # 4. HANDLE ackDate (custom cleaning)
-            # ---------------------------------------------------
-            raw_ack = item.get("ackDate")
-            ack_date = None
-            if raw_ack:
-                clean = raw_ack.split('Z')[0].split('[')[0]
-                if '.' in clean:
-                    clean = clean.split('.')[0]
-                try:
-                    ack_date = datetime.strptime(clean, '%Y-%m-%dT%H:%M:%S')
-                except Exception:
-                    ack_date = raw_ack
-                    _logger.error(f"⚠ Invalid ackDate format for invoice {invoice.name}: {raw_ack}")
+            inbox.write({'invoice_id': invoice.id, 'irn': item.get("irn"), 'state': 'processed'})
+            items_by_invoice[invoice.id] = (invoice, item, item_json)
+            used_mappings |= mapping
+            processed_docs.append(doc_no)
+        # Unmatched items are taken again if the callback is redelivered
+        unmatched.write({'state': 'unmatched'})
 
-            # ---------------------------------------------------
-            # 4. FIND OR CREATE EIMS REGISTERED LOG
-            # ---------------------------------------------------
-            log = env['eims.registered.invoice'].sudo().search([('move_id', '=', invoice.id)], limit=1)
+        invoices = env['account.move'].sudo().browse(list(items_by_invoice))
+        invoices._invalidate_eims_verify_cache(invoices.mapped('eims_irn'))
+
+        # ---------------------------------------------------
+        # 5. FIND OR CREATE EIMS REGISTERED LOGS (one search, one create)
+        # ---------------------------------------------------
+        log_by_invoice = {}
+        for log in env['eims.registered.invoice'].sudo().search([('move_id', 'in', invoices.ids)]):
+            log_by_invoice.setdefault(log.move_id.id, log)
+
+        to_create = []
+        for invoice_id, (invoice, item, item_json) in items_by_invoice.items():
+            # HANDLE ackDate (custom cleaning)
+            try:
+                ack_date = parse_eims_datetime(item.get("ackDate"))
+            except ValueError:
+                ack_date = False
+                _logger.error(f"⚠ Invalid ackDate format for invoice {invoice.name}: {item.get('ackDate')}")
+
+            log = log_by_invoice.get(invoice_id)
             if not log:
-                log = env['eims.registered.invoice'].sudo().create({
+                to_create.append({
                     'move_id': invoice.id,
                     'partner_id': invoice.partner_id.id,
                     'eims_irn': invoice.eims_irn,
                     'eims_status': 'sent',
                     'amount_total': invoice.amount_total,
                     'currency_id': invoice.currency_id.id,
-                    'eims_response': json.dumps(item, indent=2),
+                    'eims_response': item_json,
                 })
-                _logger.info(f"[EIMS-BULK] Log created for invoice {invoice.name}: {log.id}")
             else:
                 # Update existing log
-                log.sudo().write({
+                log.write({
                     'eims_irn': invoice.eims_irn,
                     'eims_status': 'sent',
                     'ack_date': ack_date,
-                    'eims_response': json.dumps(item, indent=2),
+                    'eims_response': item_json,
                 })
+        if to_create:
+            logs = env['eims.registered.invoice'].sudo().create(to_create)
+            _logger.info("[EIMS-BULK] %s log(s) created", len(logs))
 
-            # ---------------------------------------------------
-            # 5. VERIFY INVOICE VIA LOG (like single send)
-            # ---------------------------------------------------
-            if hasattr(log, 'action_verify_invoice_from_log'):
-                try:
-                    log.sudo().action_verify_invoice_from_log()
-                    invoice.message_post(
-                        body=f"✅ Invoice {invoice.name} verified via bulk EIMS log {log.id}."
-                    )
-                    _logger.info(f"[EIMS-BULK] Invoice {invoice.name} verified via log {log.id}.")
-                except Exception as e:
-                    _logger.error(f"❌ Verification failed for invoice {invoice.name}: {e}")
-                    invoice.message_post(body=f"⚠ Verification failed via bulk log: {e}")
-            else:
-                _logger.warning(f"[EIMS-BULK] Verification method not found on log {log.id}")
-
-            # ---------------------------------------------------
-            # 6. DELETE MAPPING (Important!)
-            # ---------------------------------------------------
-            mapping.sudo().unlink()
-            processed_docs.append(doc_no)
-
-            # ---------------------------------------------------
-            # 7. LOG IN CHATTER
-            # ---------------------------------------------------
-            invoice.message_post(
-                body=f"📨 <b>EIMS Bulk Callback Processed</b><br/><pre>{json.dumps(item, indent=2)}</pre>"
-            )
+        # ---------------------------------------------------
+        # 6. DELETE MAPPINGS (Important!)
+        # ---------------------------------------------------
+        conversations = used_mappings.conversation_id
+        used_mappings.unlink()
+        conversations._update_callback_state()
 
         # ---------------------------------------------------
-        # 8. RETURN SUCCESS
+        # 7. VERIFY + CHATTER IN THE BACKGROUND (submission queue)
         # ---------------------------------------------------
-        return request.make_response(
-            json.dumps({
-                "message": "Bulk callback processed successfully",
-                "count": len(processed_docs),
-                "documents": processed_docs
-            }),
-            headers=[("Content-Type", "application/json")],
-            status=200
-        )
+        # The signed invoice/QR blobs are already stored on the invoice
+        notes = {
+            invoice_id: Markup(
+                "📨 <b>EIMS Bulk Callback Processed</b><br/><pre>%s</pre>"
+            ) % json.dumps({key: value for key, value in item.items() if key not in NOTE_EXCLUDED_KEYS},
+                           ensure_ascii=False)
+            for invoice_id, (invoice, item, item_json) in items_by_invoice.items()
+        }
+        env['eims.submission.queue'].sudo()._enqueue(invoices, job_type='verify', notes=notes)
+
+        return processed_docs
@@ -1,5 +1,8 @@
 from . import account_move
 from . import eims_auth
+from . import eims_auth_token
+from . import eims_submission_queue
+from . import eims_irn_pointer
 from .import res_company
 from .import res_partner
 from .import eims_registered_invoice
@@ -13,8 +16,11 @@ from . import eims_invoice_report
 from . import eims_receipt_report
 from . import eims_withhold_receipt_report
 from . import eims_bulk_mapping
+from . import eims_bulk_conversation
 from . import receipt_log
 from . import account_move_line
+from . import account_partial_reconcile
+from . import account_tax
 from . import eims_credit_memo_log
 from . import eims_withholding_receipt
 from . import eims_notification_log
@@ -1,16 +1,71 @@
 import json
 import requests
 import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 from odoo.fields import Char, One2many
 from . import eims_auth
 from odoo.exceptions import UserError
-from decimal import Decimal, ROUND_HALF_UP
-from odoo.addons.eims_test_connector_12.services.crypto_utils import sign_eims_request
+from odoo.addons.eims_test_connector_12.services.crypto_utils import sign_many
+from odoo.addons.eims_test_connector_12.services.eims_request import build_eims_request
+from odoo.addons.eims_test_connector_12.services.eims_valuation import LineInput, value_lines
+from odoo.addons.eims_test_connector_12.services.eims_verify_cache import VERIFY_CACHE, DEFAULT_TTL
+from odoo.addons.eims_test_connector_12.services.eims_body_mapper import (
+    REGISTER_BODY_MAP, VERIFY_BODY_MAP, parse_eims_datetime, write_changed,
+)
 
 _logger = logging.getLogger(__name__)
 
+EIMS_STATUS_MAPPING = {
+    "A": "verified",  # Active → Verified
+    "C": "cancelled",  # Cancelled
+    "R": "rejected",  # Rejected
+    "U": "unknown",  # Unknown / Not found
+}
+
+# Sections a register answer must carry to stand in for a verify
+EIMS_REGISTER_SECTIONS = ("BuyerDetails", "SellerDetails", "ValueDetails", "SourceSystem", "DocumentDetails")
+
+EIMS_SEND_CONCURRENCY = 8
+EIMS_SEND_COMMIT_SIZE = 50
+EIMS_BULK_CANCEL_CHUNK_SIZE = 200
+EIMS_RECEIPT_MAX_INVOICES = 100
+
+
+def _map_concurrently(func, items, max_workers):
+    """
+    Run `func` over `items`, at most `max_workers` at a time, and return
+    [(result, error)] in the order of `items`. `func` must not touch the
+    ORM, env or cursor: it runs in worker threads.
+    """
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            return None, e
+
+    if max_workers < 2 or len(items) < 2:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="eims-send") as executor:
+        return list(executor.map(call, items))
+
+
+def _post_eims_requests(http, url, headers, bodies, max_workers, timeout):
+    """
+    POST pre-built request bodies concurrently and return
+    [(status_code, json, error)] in the order of `bodies`.
+    """
+    def post(body):
+        response = http.post(url, headers=headers, data=body, timeout=timeout)
+        return response.status_code, response.json()
+
+    return [
+        (result[0], result[1], None) if error is None else (None, None, error)
+        for result, error in _map_concurrently(post, bodies, max_workers)
+    ]
+
 
 class AccountMove(models.Model):
     _inherit = 'account.move'
@@ -28,7 +83,7 @@ class AccountMove(models.Model):
 
     # --- Fields for EIMS Registration ---
     # single
-    eims_irn = fields.Char(string="EIMS IRN")
+    eims_irn = fields.Char(string="EIMS IRN", index='btree_not_null')
     eims_ack_date = fields.Datetime(string="EIMS Acknowledgement Date")
     eims_signed_invoice = fields.Text("EIMS Signed Invoice (Base64)")
     eims_qr_code = fields.Text("EIMS QR Code (Base64)")
@@ -276,9 +331,9 @@ class AccountMove(models.Model):
         # Auto-send if it's an outgoing invoice already posted
         if invoice.move_type == 'out_invoice' and invoice.state == 'posted':
             try:
-                invoice.send_to_eims_single()
+                self.env['eims.submission.queue']._enqueue(invoice)
             except Exception as e:
-                invoice.message_post(body=f"❌ Error sending invoice to EIMS: {e}")
+                invoice.message_post(body=f"❌ Error queueing invoice for EIMS: {e}")
         return invoice
 
     def action_post_eims(self):
@@ -317,50 +372,31 @@ class AccountMove(models.Model):
     eims_log_id = fields.Many2one('eims.registered.invoice', string="EIMS Log")
 
     def action_send_to_eims(self):
+        """Post the invoice if needed and queue it for EIMS submission."""
         self.ensure_one()
-        try:
-            # 0️⃣ Check if invoice is draft and post it with defaults
-            if self.state == 'draft':
-                self.action_post_eims()
-            # 1️⃣ Auto-post the invoice if not already posted
-            if self.state != 'posted':
-                _logger.info(f"[EIMS] Auto-posting invoice {self.name}")
-                self.action_post()
-
-            # 2️⃣ Send invoice to EIMS
-            self.send_to_eims_single()
-            _logger.info(f"[EIMS] Invoice {self.name} sent successfully.")
-            self.message_post(body=f"📤 Invoice {self.name} sent to EIMS successfully.")
-
-            # 3️⃣ Find or create the EIMS log
-            log = self.env['eims.registered.invoice'].search([('move_id', '=', self.id)], limit=1)
-            if not log:
-                log = self.env['eims.registered.invoice'].create({
-                    'move_id': self.id,
-                    'eims_irn': self.eims_irn,  # or other fields from response
-                    'status': 'success'
-                })
-                _logger.info(f"[EIMS] Log created for invoice {self.name}: {log.id}")
+        # 0️⃣ Check if invoice is draft and post it with defaults
+        if self.state == 'draft':
+            self.action_post_eims()
+        # 1️⃣ Auto-post the invoice if not already posted
+        if self.state != 'posted':
+            _logger.info(f"[EIMS] Auto-posting invoice {self.name}")
+            self.action_post()
+
+        # 2️⃣ Fail fast on data errors, the MoR round trip runs in the background
+        self._check_eims_buyer()
+        self.env['eims.submission.queue']._enqueue(self)
+        self.message_post(body=f"🕒 Invoice {self.name} queued for EIMS submission.")
 
-            # 4️⃣ Verify invoice via the log
-            if hasattr(log, 'action_verify_invoice_from_log'):
-                log.action_verify_invoice_from_log()
-                _logger.info(f"[EIMS] Invoice {self.name} verified via log {log.id}.")
-                self.message_post(body=f"✅ Invoice {self.name} verified via EIMS log.")
-            else:
-                _logger.warning(f"[EIMS] Verification method not found on log {log.id}")
-
-
-        except Exception as e:
-            # Convert error to readable text
-            real_error = str(e)
-            error_msg = f"❌ Error sending/verifying invoice {self.name} via EIMS:\n{real_error}"
-            _logger.error(error_msg)
-            # Log full traceback for debugging
-            _logger.exception("EIMS send/verify failed")
-            self.message_post(body=error_msg)
-            # Show REAL error in popup
-            raise UserError(real_error)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'EIMS',
+                'message': f'Invoice {self.name} queued for EIMS submission.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
 
     def action_send_eims_email(self):
         """Manual button to send EIMS email independently."""
@@ -402,7 +438,7 @@ class AccountMove(models.Model):
         except Exception as e:
             self.message_post(body=f"⚠ Failed to send cancellation email: {e}")
 
-    def _send_eims_email(self):
+    def _send_eims_email(self, force_send=True):
         """Automatically send EIMS email after invoice becomes VERIFIED."""
         self.ensure_one()
 
@@ -421,7 +457,7 @@ class AccountMove(models.Model):
 
         # 📤 Send email
         try:
-            template.send_mail(record.id, force_send=True)
+            template.send_mail(record.id, force_send=force_send)
             record.message_post(body="📧 EIMS email sent automatically after verification.")
             _logger.info(f"[EIMS EMAIL] Auto-email sent for invoice {record.name}")
             return True
@@ -431,7 +467,7 @@ class AccountMove(models.Model):
             _logger.error(f"[EIMS EMAIL] Auto-email FAILED for invoice {record.name}: {e}")
             return False
 
-    def _send_eims_receipt_email(self):
+    def _send_eims_receipt_email(self, force_send=True):
         """Automatically send EIMS receipt email after receipt is successfully created."""
         self.ensure_one()
 
@@ -449,7 +485,7 @@ class AccountMove(models.Model):
             raise UserError("Email template for EIMS receipt not found.")
 
         try:
-            template.send_mail(record.id, force_send=True)
+            template.send_mail(record.id, force_send=force_send)
             record.message_post(body="📧 EIMS Receipt email sent automatically.")
             _logger.info(f"[EIMS RECEIPT EMAIL] Auto-email sent for invoice {record.name}")
             return True
@@ -459,7 +495,7 @@ class AccountMove(models.Model):
             _logger.error(f"[EIMS RECEIPT EMAIL] FAILED for invoice {record.name}: {e}")
             return False
 
-    def _send_eims_cancelled_email(self):
+    def _send_eims_cancelled_email(self, force_send=True):
 
         _logger.warning("📨 Cancel Email Function Triggered for %s", self.name)
 
@@ -470,7 +506,7 @@ class AccountMove(models.Model):
         )
 
         try:
-            mail_id = template.send_mail(self.id, force_send=True, raise_exception=True)
+            mail_id = template.send_mail(self.id, force_send=force_send, raise_exception=True)
             self.message_post(body=f"📧 EIMS cancellation email sent (Mail ID: {mail_id})")
             _logger.info(f"[EIMS EMAIL] Cancellation email sent for invoice {self.name}, mail_id={mail_id}")
         except Exception as e:
@@ -531,22 +567,91 @@ class AccountMove(models.Model):
 
     def verify_eims_invoice(self, irn):
 
+        try:
+            data = self._fetch_eims_verify_data(irn)
+        except ValueError:
+            raise UserError("Invalid JSON from EIMS verify service.")
+
+        return self._parse_eims_verify_status(data)
+
+    def _get_eims_verify_cache_ttl(self):
+        value = self.env['ir.config_parameter'].sudo().get_param('eims.verify_cache_ttl')
+        try:
+            return int(value) if value else DEFAULT_TTL
+        except ValueError:
+            return DEFAULT_TTL
+
+    @api.model
+    def _eims_verify_fetcher(self, http, url, headers):
+        """Return irn -> verify answer, network only (safe in worker threads)."""
+        def fetch(irn):
+            request_body = build_eims_request({"irn": irn})
+            response = http.post(url, data=request_body, headers=headers, timeout=(5, 30))
+            return response.json()
+        return fetch
+
+    @api.model
+    def _fetch_eims_verify_data(self, irn):
+        """
+        Signed /v1/verify answer for `irn`. Answers are cached per database
+        for eims.verify_cache_ttl seconds and concurrent verifies of one IRN
+        share a single request.
+        """
+        key = self._get_eims_verify_keys([irn])[irn]
+        data = VERIFY_CACHE.get(key)
+        if data is not None:
+            return data
+
         token, encryption_key = self.env['eims.auth'].get_eims_token()
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
+            "Accept": "*/*"
         }
         param_obj = self.env['ir.config_parameter'].sudo()
         url = param_obj.get_param('eims.api_single.verify_url',
                                   default='https://core.mor.gov.et/v1/verify')
+        fetch = self._eims_verify_fetcher(self.env['eims.auth'].get_eims_http_session(), url, headers)
+        return VERIFY_CACHE.get_or_fetch(key, lambda: fetch(irn), self._get_eims_verify_cache_ttl())
 
-        response = requests.post(url, json={"irn": irn}, headers=headers, timeout=30)
+    def _verify_eims_many(self, irns, http, url, headers, max_workers):
+        """Verify answers for `irns` as [(data, error)], concurrently and through the cache."""
+        keys = self._get_eims_verify_keys(irns)
+        ttl = self._get_eims_verify_cache_ttl()
+        fetch = self._eims_verify_fetcher(http, url, headers)
 
-        try:
-            data = response.json()
-        except:
-            raise UserError("Invalid JSON from EIMS verify service.")
+        def verify(irn):
+            return VERIFY_CACHE.get_or_fetch(keys[irn], lambda: fetch(irn), ttl)
+
+        return _map_concurrently(verify, irns, max_workers)
+
+    @api.model
+    def _get_eims_verify_keys(self, irns):
+        """
+        {irn: verify cache key} for `irns`. The key holds the last write date
+        of the invoices carrying the IRN: registering, cancelling or a bulk
+        callback writes them, so once committed, the answers cached by every
+        worker for the previous state are no longer used.
+        """
+        irns = set(irns)
+        stamps = {}
+        if any(irns):
+            self.flush_model(['eims_irn', 'write_date'])
+            self.env.cr.execute(
+                "SELECT eims_irn, max(write_date) FROM account_move WHERE eims_irn IN %s GROUP BY eims_irn",
+                [tuple(irn for irn in irns if irn)],
+            )
+            stamps = dict(self.env.cr.fetchall())
+        dbname = self.env.cr.dbname
+        return {irn: (dbname, irn, stamps.get(irn)) for irn in irns}
+
+    @api.model
+    def _invalidate_eims_verify_cache(self, irns):
+        dbname = self.env.cr.dbname
+        VERIFY_CACHE.invalidate([(dbname, irn) for irn in irns if irn])
 
+    @api.model
+    def _parse_eims_verify_status(self, data):
         body = data.get("body") or {}
 
         # Detect clean cases
@@ -566,14 +671,10 @@ class AccountMove(models.Model):
 
     def send_to_eims_single(self):
 
-        status_mapping = {
-            "A": "verified",  # Active → Verified
-            "C": "cancelled",  # Cancelled
-            "R": "rejected",  # Rejected
-            "U": "unknown",  # Unknown / Not found
-        }
+        status_mapping = EIMS_STATUS_MAPPING
         # Get the smart session
         http = self.env['eims.auth'].get_eims_http_session()
+        to_send = self.browse()
 
         for record in self:
 
@@ -592,25 +693,7 @@ class AccountMove(models.Model):
             # ---------------------------
             # IRC-N08 VALIDATE BUYER TIN & LEGAL NAME
             # ---------------------------
-            buyer = record.partner_id
-
-            # Legal Name
-            if not buyer.name or buyer.name.strip() == "" or buyer.name.upper() in ["ABCDEFG", "ABCDEF", "XXXXXX"]:
-                raise UserError("❌ Invalid Buyer Legal Name.\n\nPlease enter a valid registered buyer name.")
-
-            # TIN required only for companies (B2B), not for individuals (B2C)
-            if buyer.company_type == "company":
-                if not buyer.eims_tin:
-                    raise UserError("❌ Buyer TIN is missing. A valid 10-digit TIN is required for company customers.")
-
-                # Invalid TIN patterns
-                invalid_tins = ["0000000000", "000000000", "1111111111", "1234567890"]
-                if buyer.eims_tin in invalid_tins:
-                    raise UserError("❌ Invalid Buyer TIN. Cannot use placeholder values like 0000000000.")
-
-                # TIN must be numeric 10 digits
-                if not buyer.eims_tin.isdigit() or len(buyer.eims_tin) != 10:
-                    raise UserError("❌ Buyer TIN must be a 10-digit numeric value.")
+            record._check_eims_buyer()
 
             # ---------------------------
             # VERIFY BEFORE RESENDING
@@ -625,25 +708,39 @@ class AccountMove(models.Model):
                 if eims_status_raw == "A":
                     raise UserError("❌ Invoice is ACTIVE in EIMS. You cannot resend unless it is cancelled.")
 
-                # --- 2) CANCELLED → allowed ---
-                if eims_status_raw == "C":
-                    record.message_post(body="ℹ EIMS: Invoice is CANCELLED. Resending allowed.")
+                # --- 2) CANCELLED / REJECTED / UNKNOWN → allowed ---
+                record._note_eims_resend_status(eims_status_raw)
 
-                # --- 3) REJECTED → allowed ---
-                elif eims_status_raw == "R":
-                    record.message_post(body="ℹ EIMS: Invoice was REJECTED. Resending allowed.")
+            to_send |= record
 
-                # --- 4) UNKNOWN → invoice never registered properly ---
-                elif eims_status_raw == "U":
-                    record.message_post(body="ℹ EIMS: Invoice not found (UNKNOWN). Sending as new.")
+        if not to_send:
+            return
 
-                # Anything else → allow but warn
-                else:
-                    record.message_post(body=f"⚠ Unknown verify status: {eims_status_raw}. Proceeding to send.")
+        # ---------------------------
+        # PREPARE & SIGN (whole batch at once)
+        # ---------------------------
+        request_payloads = []
+        payloads = to_send.prepare_eims_payloads()
+        for record in to_send:
+            try:
+                request_payloads.append(next(payloads))
+            except Exception as e:
+                record._raise_eims_send_error(e)
 
-            # ---------------------------
-            # NORMAL SEND PROCESS
-            # ---------------------------
+        try:
+            # SIGN requests (service layer), serialized once, in parallel
+            request_bodies = sign_many(request_payloads)
+        except Exception as e:
+            to_send._raise_eims_send_error(e)
+
+        # ---------------------------
+        # NORMAL SEND PROCESS
+        # ---------------------------
+        param_obj = self.env['ir.config_parameter'].sudo()
+        url = param_obj.get_param('eims.api_single.register_url',
+                                  default='https://core.mor.gov.et/v1/register')
+
+        for record, request_body in zip(to_send, request_bodies):
             try:
                 token, encryption_key = self.env['eims.auth'].get_eims_token()
                 headers = {
@@ -651,246 +748,480 @@ class AccountMove(models.Model):
                     "Content-Type": "application/json",
                 }
 
-                request_payload = record.prepare_eims_payload_single()
-
-                # 2️⃣ SIGN request (service layer)
-                signed_payload = sign_eims_request(request_payload)
-
-                # 3️⃣ Send
-                param_obj = self.env['ir.config_parameter'].sudo()
-                url = param_obj.get_param('eims.api_single.register_url',
-                                          default='https://core.mor.gov.et/v1/register')
+                # Send
                 response = http.post(
                     url,
                     headers=headers,
-                    json=signed_payload,
+                    data=request_body,
                     timeout=(5, 60)  # (Connect timeout, Read timeout)
                 )
-
                 res_json = response.json()
+                record._apply_eims_register_response(response.status_code, res_json)
 
-                _logger.info("==== EIMS Raw Response ====")
-                _logger.info(json.dumps(res_json, indent=2))
-                _logger.info("===========================")
+            except Exception as e:
+                record._raise_eims_send_error(e)
 
-                # SUCCESS
-                if response.status_code == 200 and res_json.get("statusCode") == 200:
+    def _note_eims_resend_status(self, eims_status_raw):
+        """Explain in the chatter why a non-active invoice is being resent."""
+        self.ensure_one()
+        # --- CANCELLED → allowed ---
+        if eims_status_raw == "C":
+            self.message_post(body="ℹ EIMS: Invoice is CANCELLED. Resending allowed.")
 
-                    body = res_json.get("body", {})
+        # --- REJECTED → allowed ---
+        elif eims_status_raw == "R":
+            self.message_post(body="ℹ EIMS: Invoice was REJECTED. Resending allowed.")
 
-                    record.eims_irn = body.get("irn")
-                    record.eims_signed_invoice = body.get("signedInvoice")
-                    record.eims_qr_code = body.get('signedQR')
-
-                    # Map the status
-                    raw_status = body.get("status")
-                    mapped_status = status_mapping.get(raw_status, "unknown")
-                    record.eims_status = mapped_status
-                    _logger.info(f"[EIMS] Status Raw: {raw_status} → Mapped: {mapped_status}")
-
-                    # Handle ackDate
-                    raw = body.get("ackDate")
-                    if raw:
-                        clean = raw.split('Z')[0].split('[')[0]
-                        if '.' in clean:
-                            clean = clean.split('.')[0]
-                        try:
-                            record.eims_ack_date = datetime.strptime(clean, '%Y-%m-%dT%H:%M:%S')
-                        except:
-                            record.eims_ack_date = raw
+        # --- UNKNOWN → invoice never registered properly ---
+        elif eims_status_raw == "U":
+            self.message_post(body="ℹ EIMS: Invoice not found (UNKNOWN). Sending as new.")
 
-                    # Log success
-                    # Populate all fields from EIMS response using helper method
-                    record._populate_fields_from_eims_body(body)
-                    
-                    # Set fields that come from payload, not response
-                    company = self.env.company
-                    transaction_type = record._get_transaction_type(record.partner_id)
-                    record.eims_transaction_type = transaction_type
-                    record.eims_document_type = "INV"
-                    record.eims_payment_mode = "CASH"
-                    record.eims_seller_vat_number = company.eims_vat_number or ""
-                    
-                    # Get previous IRN (last registered invoice before this one)
-                    previous_log = self.env['eims.registered.invoice'].search([
-                        ('move_id', '!=', record.id),
-                        ('eims_irn', '!=', False),
-                        ('status', '=', 'success'),
-                    ], order='create_date desc', limit=1)
-                    record.eims_previous_irn = previous_log.eims_irn if previous_log else ""
-
-                    # Log success with all populated fields
-                    self.env['eims.registered.invoice'].create({
-                        "move_id": record.id,
-                        "partner_id": record.partner_id.id,
-                        "eims_irn": record.eims_irn,
-                        "ack_date": record.eims_ack_date,
-                        "status": "success",
-                        "amount_total": record.amount_total,
-                        "currency_id": record.currency_id.id,
-                        "eims_response": json.dumps(res_json, indent=2),
-                        # Buyer details
-                        "eims_buyers_tin": record.eims_buyers_tin,
-                        "eims_buyers_city_code": record.eims_buyers_city_code,
-                        "eims_buyers_region": record.eims_buyers_region,
-                        "eims_buyers_wereda": record.eims_buyers_wereda,
-                        "eims_buyers_id_type": record.eims_buyers_id_type,
-                        "eims_buyers_id_number": record.eims_buyers_id_number,
-                        "eims_buyers_legal_name": record.eims_buyers_legal_name,
-                        "eims_buyers_email": record.eims_buyers_email,
-                        "eims_buyers_phone": record.eims_buyers_phone,
-                        # Seller details
-                        "eims_seller_tin": record.eims_seller_tin,
-                        "eims_seller_city_code": record.eims_seller_city_code,
-                        "eims_seller_region": record.eims_seller_region,
-                        "eims_seller_wereda": record.eims_seller_wereda,
-                        "eims_seller_legal_name": record.eims_seller_legal_name,
-                        "eims_seller_email": record.eims_seller_email,
-                        "eims_seller_phone": record.eims_seller_phone,
-                        "eims_seller_tax_center": record.eims_seller_tax_center,
-                        "eims_seller_vat_number": record.eims_seller_vat_number,
-                        "eims_seller_house_number": record.eims_seller_house_number,
-                        "eims_seller_locality": record.eims_seller_locality,
-                        # Value details
-                        "eims_total_value": record.eims_total_value,
-                        "eims_tax_value": record.eims_tax_value,
-                        "eims_invoice_currency": record.eims_invoice_currency,
-                        # Payment details
-                        "eims_payment_mode": record.eims_payment_mode,
-                        "eims_payment_term": record.eims_payment_term,
-                        # Source system
-                        "eims_source_system": record.eims_source_system,
-                        "eims_cashier_name": record.eims_cashier_name,
-                        "eims_system_number": record.eims_system_number,
-                        "eims_invoice_counter": record.eims_invoice_counter,
-                        "eims_sales_person_name": record.eims_sales_person_name,
-                        # Document details
-                        "eims_document_number": record.eims_document_number,
-                        "eims_document_date": record.eims_document_date,
-                        "eims_document_type": record.eims_document_type,
-                        "eims_document_reason": record.eims_document_reason,
-                        # Transaction details
-                        "eims_transaction_type": record.eims_transaction_type,
-                        "eims_reference_details": record.eims_reference_details,
-                        "eims_previous_irn": record.eims_previous_irn,
-                        "eims_related_document": record.eims_related_document,
-                        # Base64 data
-                        "eims_signed_invoice": record.eims_signed_invoice,
-                        "eims_qr_code": record.eims_qr_code,
-                        "eims_status": mapped_status,
-                    })
+        # Anything else → allow but warn
+        else:
+            self.message_post(body=f"⚠ Unknown verify status: {eims_status_raw}. Proceeding to send.")
 
-                    record.message_post(
-                        body=f"✅ EIMS Submission Successful\nIRN: {record.eims_irn}\nAck Date: {record.eims_ack_date}"
-                    )
+    def send_to_eims_batch(self, max_workers=None):
+        """
+        Register many invoices with EIMS, overlapping the MoR round trips.
+
+        1. validate, prepare and sign every invoice on this thread;
+        2. verify resends and POST the registrations from a bounded thread
+           pool (network only, see _post_eims_requests);
+        3. apply the answers on this thread, committing every
+           `eims.send_commit_size` invoices;
+        4. verify the new IRNs the same way, unless the register answer
+           already is authoritative (eims.verify_after_register), then
+           queue the emails.
+
+        One invoice failing does not stop the others.
+        Returns {move_id: (success, message)}.
+        """
+        outcomes = {}
 
-                    # ----------------------------------------------------
-                    # 📧 SEND EMAIL AFTER VERIFIED (ACTIVE) STATUS
-                    # ----------------------------------------------------
-                    if record.eims_status == "verified":
-                        try:
-                            record._send_eims_email()
-                        except Exception as email_err:
-                            record.message_post(body=f"⚠ Email could NOT be sent: {email_err}")
+        def fail(record, error):
+            outcomes[record.id] = (False, str(error))
+            record.eims_receipt_status = 'failed'
+            record.message_post(body=f"❌ EIMS submission failed: {error}")
+            _logger.error(f"[EIMS] Batch send failed for invoice {record.name}: {error}")
+
+        param_obj = self.env['ir.config_parameter'].sudo()
+        if max_workers is None:
+            max_workers = int(param_obj.get_param('eims.send_concurrency', EIMS_SEND_CONCURRENCY))
+        # More threads than pooled connections would only open throwaway sockets
+        max_workers = min(max_workers, self.env['eims.auth']._get_http_pool_size())
+        commit_size = max(int(param_obj.get_param('eims.send_commit_size', EIMS_SEND_COMMIT_SIZE)), 1)
+
+        # ---------------------------
+        # VALIDATION
+        # ---------------------------
+        candidates = self.browse()
+        for record in self:
+            if record.move_type != 'out_invoice':
+                outcomes[record.id] = (False, "Only customer invoices are sent to EIMS.")
+                continue
+            try:
+                if record.state not in ['posted', 'cancel'] and not record.eims_irn:
+                    raise UserError("❌ Only POSTED invoices or CANCELLED invoices with IRN can be sent to EIMS.")
+                record._check_eims_buyer()
+            except UserError as e:
+                fail(record, e)
+                continue
+            candidates |= record
+
+        if not candidates:
+            return outcomes
 
+        # Authenticate once, the worker threads only get the headers
+        http = self.env['eims.auth'].get_eims_http_session()
+        token, encryption_key = self.env['eims.auth'].get_eims_token()
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        verify_url = param_obj.get_param('eims.api_single.verify_url',
+                                         default='https://core.mor.gov.et/v1/verify')
+        register_url = param_obj.get_param('eims.api_single.register_url',
+                                           default='https://core.mor.gov.et/v1/register')
+
+        # ---------------------------
+        # VERIFY BEFORE RESENDING
+        # ---------------------------
+        resends = candidates.filtered('eims_irn')
+        resend_ok_ids = set()
+        if resends:
+            results = self._verify_eims_many(resends.mapped('eims_irn'), http, verify_url, headers, max_workers)
+            for record, (data, error) in zip(resends, results):
+                if error:
+                    fail(record, error)
                     continue
+                eims_status_raw = self._parse_eims_verify_status(data).get("eims_status")
+                if eims_status_raw == "A":
+                    fail(record, "❌ Invoice is ACTIVE in EIMS. You cannot resend unless it is cancelled.")
+                    continue
+                record._note_eims_resend_status(eims_status_raw)
+                resend_ok_ids.add(record.id)
+
+        to_send = candidates.filtered(lambda r: not r.eims_irn or r.id in resend_ok_ids)
+        if not to_send:
+            return outcomes
+
+        # ---------------------------
+        # PREPARE & SIGN
+        # ---------------------------
+        to_send._prefetch_eims_payload_data()
+        sequence_numbers = to_send._reserve_eims_sequence_numbers(len(to_send))
+        prepared = self.browse()
+        request_payloads = []
+        for record, sequence_number in zip(to_send, sequence_numbers):
+            try:
+                request_payloads.append(record._prepare_eims_payload(sequence_number))
+            except Exception as e:
+                fail(record, e)
+                continue
+            prepared |= record
 
-                # FAILURE
+        try:
+            request_bodies = sign_many(request_payloads)
+        except Exception as e:
+            for record in prepared:
+                fail(record, e)
+            return outcomes
+
+        # ---------------------------
+        # REGISTER (concurrent) → APPLY (grouped commits)
+        # ---------------------------
+        results = _post_eims_requests(http, register_url, headers, request_bodies, max_workers, (5, 60))
+        registered = self.browse()
+        register_bodies = {}
+        for index, (record, (status_code, res_json, error)) in enumerate(zip(prepared, results), 1):
+            if error:
+                fail(record, error)
+            else:
+                try:
+                    with self.env.cr.savepoint():
+                        success = record._apply_eims_register_response(status_code, res_json, send_email=False)
+                except Exception as e:
+                    fail(record, e)
                 else:
-                    self.env['eims.registered.invoice'].create({
-                        "move_id": record.id,
-                        "partner_id": record.partner_id.id,
-                        "status": "failed",
-                        "amount_total": record.amount_total,
-                        "currency_id": record.currency_id.id,
-                        "eims_response": json.dumps(res_json, indent=2)
-                    })
-                    record.message_post(body=f"❌ Single EIMS Failed: {res_json}")
+                    if success:
+                        registered |= record
+                        register_bodies[record.id] = res_json.get("body") or {}
+                        outcomes[record.id] = (True, record.eims_irn)
+                    else:
+                        outcomes[record.id] = (False, f"❌ Single EIMS Failed: {res_json}")
+            if index % commit_size == 0:
+                self.env.cr.commit()
+        self.env.cr.commit()
+
+        if not registered:
+            return outcomes
+
+        log_by_move = {}
+        for log in self.env['eims.registered.invoice'].search([('move_id', 'in', registered.ids)]):
+            log_by_move.setdefault(log.move_id.id, log)
+
+        # ---------------------------
+        # VERIFY: reuse an authoritative register answer, else verify
+        # ---------------------------
+        verify_mode = self._get_eims_verify_mode()
+        to_verify = self.browse()
+        for record in registered:
+            body = register_bodies[record.id]
+            if verify_mode != 'always' and self._is_eims_register_body_authoritative(body):
+                # The IRN is committed already: a failure here only leaves
+                # the invoice unverified, it must not fail the batch
+                try:
+                    with self.env.cr.savepoint():
+                        record._apply_eims_register_as_verified(body)
+                        if record.id in log_by_move:
+                            log_by_move[record.id]._sync_from_verified_move()
+                except Exception as e:
+                    _logger.error(f"[EIMS] Recording the verification of {record.name} failed: {e}")
+                    record.message_post(body=f"⚠️ Verification Error: {str(e)}")
+            elif verify_mode != 'never':
+                to_verify |= record
+        self.env.cr.commit()
 
+        if to_verify:
+            self._verify_eims_batch(to_verify, log_by_move, http, verify_url, headers, max_workers, commit_size)
 
+        # 📧 Emails go through the mail queue instead of one SMTP round trip each
+        for record in registered.filtered(lambda r: r.eims_status == "verified"):
+            try:
+                record._send_eims_email(force_send=False)
+            except Exception as email_err:
+                record.message_post(body=f"⚠ Email could NOT be sent: {email_err}")
+
+        return outcomes
+
+    def _is_eims_job_done(self, job_type, irn_before):
+        """Whether the committed state shows a queued job as done (see eims.submission.queue)."""
+        self.ensure_one()
+        if job_type == "verify":
+            return self.eims_status == "verified"
+        return bool(self.eims_irn) and self.eims_irn != irn_before
+
+    def verify_eims_batch(self, max_workers=None):
+        """
+        Verify registered invoices with EIMS, overlapping the MoR round trips
+        (see send_to_eims_batch). Returns {move_id: (success, message)}.
+        """
+        param_obj = self.env['ir.config_parameter'].sudo()
+        if max_workers is None:
+            max_workers = int(param_obj.get_param('eims.send_concurrency', EIMS_SEND_CONCURRENCY))
+        max_workers = min(max_workers, self.env['eims.auth']._get_http_pool_size())
+        commit_size = max(int(param_obj.get_param('eims.send_commit_size', EIMS_SEND_COMMIT_SIZE)), 1)
 
+        outcomes = {move.id: (False, "Invoice does not have an IRN yet.") for move in self if not move.eims_irn}
+        moves = self.filtered('eims_irn')
+        if not moves:
+            return outcomes
 
+        http = self.env['eims.auth'].get_eims_http_session()
+        token, encryption_key = self.env['eims.auth'].get_eims_token()
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        verify_url = param_obj.get_param('eims.api_single.verify_url',
+                                         default='https://core.mor.gov.et/v1/verify')
+        log_by_move = {}
+        for log in self.env['eims.registered.invoice'].search([('move_id', 'in', moves.ids)]):
+            log_by_move.setdefault(log.move_id.id, log)
+
+        outcomes.update(
+            self._verify_eims_batch(moves, log_by_move, http, verify_url, headers, max_workers, commit_size)
+        )
+        return outcomes
+
+    def _verify_eims_batch(self, moves, log_by_move, http, url, headers, max_workers, commit_size):
+        """Verify registered invoices concurrently, apply the answers in grouped commits."""
+        outcomes = {}
+        results = self._verify_eims_many(moves.mapped('eims_irn'), http, url, headers, max_workers)
+
+        for index, (record, (data, error)) in enumerate(zip(moves, results), 1):
+            try:
+                with self.env.cr.savepoint():
+                    if error:
+                        raise error
+                    record._apply_eims_verify_response(data)
+                    if record.id in log_by_move:
+                        log_by_move[record.id]._sync_from_verified_move()
+                outcomes[record.id] = (True, record.eims_status)
             except Exception as e:
-                self.eims_receipt_status = 'failed'
-                self.message_post(body=f"⚠️ Error creating receipt: {repr(e)}")
-                _logger.error(f"EIMS Receipt Error for Invoice {self.name}: {repr(e)}")
-                raise UserError(_("Failed to create EIMS INV. Check logs."))
+                outcomes[record.id] = (False, str(e))
+                record.message_post(body=f"⚠️ Verification Error: {str(e)}")
+            if index % commit_size == 0:
+                self.env.cr.commit()
+        self.env.cr.commit()
+        return outcomes
+
+    def _get_eims_verify_mode(self):
+        """
+        eims.verify_after_register:
+          auto   - skip the verify round trip when the register answer is
+                   authoritative, verify otherwise (default);
+          always - always verify after registering;
+          never  - never verify automatically (use the Verify button).
+        """
+        mode = self.env['ir.config_parameter'].sudo().get_param('eims.verify_after_register', 'auto')
+        return mode if mode in ('auto', 'always', 'never') else 'auto'
+
+    @api.model
+    def _is_eims_register_body_authoritative(self, body):
+        """An ACTIVE register answer carrying every section replaces a verify."""
+        return bool(
+            body.get("irn")
+            and body.get("status") == "A"
+            and all(body.get(section) for section in EIMS_REGISTER_SECTIONS)
+        )
+
+    def _apply_eims_register_as_verified(self, body):
+        """Record a verification from the register answer already applied."""
+        self.ensure_one()
+        write_changed(self, {
+            "eims_verified": True,
+            "eims_verified_data": body,
+            "eims_verification_status": body.get("status", body.get("Status", "ACTIVE")),
+        })
+        self.message_post(
+            body=f"✅ Invoice Verified via EIMS registration response<br/>"
+                 f"IRN: {self.eims_irn}<br/>"
+                 f"Document No: {self.eims_document_number}"
+        )
+
+    def _apply_eims_register_response(self, status_code, res_json, send_email=True):
+        """Store the MoR answer to a register request; return True on success."""
+        self.ensure_one()
+        _logger.info("==== EIMS Raw Response ====")
+        _logger.info(json.dumps(res_json, indent=2))
+        _logger.info("===========================")
+
+        # SUCCESS
+        if status_code == 200 and res_json.get("statusCode") == 200:
+
+            body = res_json.get("body", {})
+            irn = body.get("irn")
+            self._invalidate_eims_verify_cache([self.eims_irn, irn])
+
+            # Map the status
+            raw_status = body.get("status")
+            mapped_status = EIMS_STATUS_MAPPING.get(raw_status, "unknown")
+            _logger.info(f"[EIMS] Status Raw: {raw_status} → Mapped: {mapped_status}")
+
+            # Populate all fields from EIMS response, then the ones that
+            # come from the payload, not the response
+            values = REGISTER_BODY_MAP.values(self, body)
+            company = self.company_id
+            values.update({
+                "eims_irn": irn,
+                "eims_signed_invoice": body.get("signedInvoice"),
+                "eims_qr_code": body.get("signedQR"),
+                "eims_status": mapped_status,
+                "eims_transaction_type": self._get_transaction_type(self.partner_id),
+                "eims_document_type": "INV",
+                "eims_payment_mode": "CASH",
+                "eims_seller_vat_number": company.eims_vat_number or "",
+                # Previous IRN (last registered invoice before this one)
+                "eims_previous_irn": self.env['eims.irn.pointer']._swap_last_irn(self, irn) if irn else "",
+            })
+
+            # Handle ackDate
+            try:
+                ack_date = parse_eims_datetime(body.get("ackDate"))
+                if ack_date:
+                    values["eims_ack_date"] = ack_date
+            except ValueError:
+                _logger.warning(f"[EIMS] Invalid ackDate for invoice {self.name}: {body.get('ackDate')}")
+
+            write_changed(self, values)
+
+            # Log success with all populated fields
+            self.env['eims.registered.invoice'].create({
+                "move_id": self.id,
+                "partner_id": self.partner_id.id,
+                "eims_irn": self.eims_irn,
+                "ack_date": self.eims_ack_date,
+                "status": "success",
+                "amount_total": self.amount_total,
+                "currency_id": self.currency_id.id,
+                "eims_response": json.dumps(res_json, indent=2),
+                # Buyer details
+                "eims_buyers_tin": self.eims_buyers_tin,
+                "eims_buyers_city_code": self.eims_buyers_city_code,
+                "eims_buyers_region": self.eims_buyers_region,
+                "eims_buyers_wereda": self.eims_buyers_wereda,
+                "eims_buyers_id_type": self.eims_buyers_id_type,
+                "eims_buyers_id_number": self.eims_buyers_id_number,
+                "eims_buyers_legal_name": self.eims_buyers_legal_name,
+                "eims_buyers_email": self.eims_buyers_email,
+                "eims_buyers_phone": self.eims_buyers_phone,
+                # Seller details
+                "eims_seller_tin": self.eims_seller_tin,
+                "eims_seller_city_code": self.eims_seller_city_code,
+                "eims_seller_region": self.eims_seller_region,
+                "eims_seller_wereda": self.eims_seller_wereda,
+                "eims_seller_legal_name": self.eims_seller_legal_name,
+                "eims_seller_email": self.eims_seller_email,
+                "eims_seller_phone": self.eims_seller_phone,
+                "eims_seller_tax_center": self.eims_seller_tax_center,
+                "eims_seller_vat_number": self.eims_seller_vat_number,
+                "eims_seller_house_number": self.eims_seller_house_number,
+                "eims_seller_locality": self.eims_seller_locality,
+                # Value details
+                "eims_total_value": self.eims_total_value,
+                "eims_tax_value": self.eims_tax_value,
+                "eims_invoice_currency": self.eims_invoice_currency,
+                # Payment details
+                "eims_payment_mode": self.eims_payment_mode,
+                "eims_payment_term": self.eims_payment_term,
+                # Source system
+                "eims_source_system": self.eims_source_system,
+                "eims_cashier_name": self.eims_cashier_name,
+                "eims_system_number": self.eims_system_number,
+                "eims_invoice_counter": self.eims_invoice_counter,
+                "eims_sales_person_name": self.eims_sales_person_name,
+                # Document details
+                "eims_document_number": self.eims_document_number,
+                "eims_document_date": self.eims_document_date,
+                "eims_document_type": self.eims_document_type,
+                "eims_document_reason": self.eims_document_reason,
+                # Transaction details
+                "eims_transaction_type": self.eims_transaction_type,
+                "eims_reference_details": self.eims_reference_details,
+                "eims_previous_irn": self.eims_previous_irn,
+                "eims_related_document": self.eims_related_document,
+                # Base64 data
+                "eims_signed_invoice": self.eims_signed_invoice,
+                "eims_qr_code": self.eims_qr_code,
+                "eims_status": mapped_status,
+            })
+
+            self.message_post(
+                body=f"✅ EIMS Submission Successful\nIRN: {self.eims_irn}\nAck Date: {self.eims_ack_date}"
+            )
+
+            # ----------------------------------------------------
+            # 📧 SEND EMAIL AFTER VERIFIED (ACTIVE) STATUS
+            # ----------------------------------------------------
+            if send_email and self.eims_status == "verified":
+                try:
+                    self._send_eims_email()
+                except Exception as email_err:
+                    self.message_post(body=f"⚠ Email could NOT be sent: {email_err}")
+
+            return True
+
+        # FAILURE
+        else:
+            self.env['eims.registered.invoice'].create({
+                "move_id": self.id,
+                "partner_id": self.partner_id.id,
+                "status": "failed",
+                "amount_total": self.amount_total,
+                "currency_id": self.currency_id.id,
+                "eims_response": json.dumps(res_json, indent=2)
+            })
+            self.message_post(body=f"❌ Single EIMS Failed: {res_json}")
+            return False
+
+    def _check_eims_buyer(self):
+        """IRC-N08: validate the buyer TIN & legal name before sending."""
+        for record in self:
+            buyer = record.partner_id
+
+            # Legal Name
+            if not buyer.name or buyer.name.strip() == "" or buyer.name.upper() in ["ABCDEFG", "ABCDEF", "XXXXXX"]:
+                raise UserError("❌ Invalid Buyer Legal Name.\n\nPlease enter a valid registered buyer name.")
+
+            # TIN required only for companies (B2B), not for individuals (B2C)
+            if buyer.company_type == "company":
+                if not buyer.eims_tin:
+                    raise UserError("❌ Buyer TIN is missing. A valid 10-digit TIN is required for company customers.")
+
+                # Invalid TIN patterns
+                invalid_tins = ["0000000000", "000000000", "1111111111", "1234567890"]
+                if buyer.eims_tin in invalid_tins:
+                    raise UserError("❌ Invalid Buyer TIN. Cannot use placeholder values like 0000000000.")
+
+                # TIN must be numeric 10 digits
+                if not buyer.eims_tin.isdigit() or len(buyer.eims_tin) != 10:
+                    raise UserError("❌ Buyer TIN must be a 10-digit numeric value.")
+
+    def _raise_eims_send_error(self, error):
+        """Flag a failed single send on the given invoices and abort."""
+        for record in self:
+            record.eims_receipt_status = 'failed'
+            record.message_post(body=f"⚠️ Error creating receipt: {repr(error)}")
+            _logger.error(f"EIMS Receipt Error for Invoice {record.name}: {repr(error)}")
+        raise UserError(_("Failed to create EIMS INV. Check logs."))
 
     def _populate_fields_from_eims_body(self, body):
         """
         Centralized method to populate invoice fields from EIMS response body.
         Called by both registration and verification flows.
         """
-        # Parse all sections from EIMS response
-        buyer_details = body.get("BuyerDetails", {})
-        seller_details = body.get("SellerDetails", {})
-        value_details = body.get("ValueDetails", {})
-        payment_details = body.get("PaymentDetails", {})
-        source_system = body.get("SourceSystem", {})
-        document_details = body.get("DocumentDetails", {})
-        transaction_details = body.get("TransactionDetails", {})
-        reference_details = body.get("ReferenceDetails", {})  # At root level!
-
-        # Buyer Details
-        self.eims_buyers_tin = buyer_details.get("Tin") or ""
-        self.eims_buyers_city_code = buyer_details.get("City") or ""
-        self.eims_buyers_region = buyer_details.get("Region") or ""
-        self.eims_buyers_wereda = buyer_details.get("Wereda") or ""
-        self.eims_buyers_vat_number = buyer_details.get("VatNumber") or ""
-        self.eims_buyers_id_type = buyer_details.get("IdType") or ""
-        self.eims_buyers_id_number = buyer_details.get("IdNumber") or ""
-        self.eims_buyers_legal_name = buyer_details.get("LegalName") or ""
-        self.eims_buyers_email = buyer_details.get("Email") or ""
-        self.eims_buyers_phone = buyer_details.get("Phone") or ""
-
-        # Seller Details
-        self.eims_seller_tin = seller_details.get("Tin") or ""
-        self.eims_seller_city_code = seller_details.get("City") or ""
-        self.eims_seller_region = seller_details.get("Region") or ""
-        self.eims_seller_wereda = seller_details.get("Wereda") or ""
-        self.eims_seller_legal_name = seller_details.get("LegalName") or ""
-        self.eims_seller_email = seller_details.get("Email") or ""
-        self.eims_seller_phone = seller_details.get("Phone") or ""
-        self.eims_seller_tax_center = str(seller_details.get("TaxCenter") or "")  # Convert to string
-        self.eims_seller_vat_number = seller_details.get("VatNumber") or ""  # Mixed case, not all caps!
-        self.eims_seller_house_number = seller_details.get("HouseNumber") or ""  # Might not exist in response
-        self.eims_seller_locality = seller_details.get("Locality") or ""
-
-        # Value Details
-        self.eims_total_value = value_details.get("TotalValue") or 0.0
-        self.eims_tax_value = value_details.get("TaxValue") or 0.0
-        self.eims_invoice_currency = value_details.get("InvoiceCurrency") or ""
-
-        # Payment Details
-        self.eims_payment_mode = payment_details.get("Mode") or ""  # Fixed: "Mode" not "PaymentMode"
-        self.eims_payment_term = payment_details.get("PaymentTerm") or ""
-
-        # Source System
-        self.eims_source_system = source_system.get("SystemType") or ""
-        self.eims_cashier_name = source_system.get("CashierName") or ""
-        self.eims_system_number = source_system.get("SystemNumber") or ""
-        self.eims_invoice_counter = source_system.get("InvoiceCounter") or ""
-        self.eims_sales_person_name = source_system.get("SalesPersonName") or ""
-
-        # Document Details
-        self.eims_document_number = document_details.get("DocumentNumber") or ""
-        self.eims_document_type = document_details.get("Type") or ""
-        self.eims_document_reason = document_details.get("Reason") or ""
-        
-        # Parse document date if available
-        doc_date_str = document_details.get("Date")
-        if doc_date_str:
-            try:
-                self.eims_document_date = datetime.strptime(doc_date_str, "%d-%m-%YT%H:%M:%S")
-            except:
-                pass
-
-        # Transaction Type - At root level of body!
-        self.eims_transaction_type = body.get("TransactionType") or ""  # Not in TransactionDetails!
-        
-        # Reference Details - At root level of body!
-        self.eims_previous_irn = reference_details.get("PreviousIrn") or ""  # Fixed: lowercase 'rn'
-        self.eims_related_document = reference_details.get("RelatedDocument") or ""  # Fixed: lowercase 'rd'
+        return REGISTER_BODY_MAP.apply(self, body)
 
     # Generate Credit and debit memo
     def send_credit_memo_to_eims_single(self):
@@ -928,14 +1259,14 @@ class AccountMove(models.Model):
 
                 request_payload = record.prepare_eims_payload_credit_memo()
 
-                # 2️⃣ SIGN request (service layer)
-                signed_payload = sign_eims_request(request_payload)
+                # 2️⃣ SIGN request (service layer), serialized once
+                request_body = build_eims_request(request_payload)
 
                 param_obj = self.env['ir.config_parameter'].sudo()
                 url = param_obj.get_param('eims.api_single.register_url',
                                           default='https://core.mor.gov.et/v1/register')
 
-                response = http.post(url, headers=headers, json=signed_payload, timeout=(5, 60))
+                response = http.post(url, headers=headers, data=request_body, timeout=(5, 60))
                 res_json = response.json()
 
                 # Store response for logging in action function
@@ -1000,7 +1331,6 @@ class AccountMove(models.Model):
         # Get the smart session
         http = self.env['eims.auth'].get_eims_http_session()
         self.ensure_one()
-        company = self.env.company
         partner = self.partner_id
         if not self.eims_irn:
             raise UserError(("Invoice has not been sent to EIMS yet."))
@@ -1011,34 +1341,7 @@ class AccountMove(models.Model):
 
         try:
             # Prepare payload
-            payload = {
-                "ReceiptNumber": "REC1234567890123466",
-                "ReceiptType": "Sales Receipts",
-                "Reason": "Payment for Invoice",
-                "ReceiptDate": self.invoice_date.strftime('%Y-%m-%dT%H:%M:%S') + "+03:00",
-                "ReceiptCounter": "12335",
-                "ManualReceiptNumber": "98766",
-                "SourceSystemType": "POS",
-                "SourceSystemNumber": company.eims_system_number,
-                "ReceiptCurrency": self.currency_id.name,
-                "CollectedAmount": self.amount_total,
-                "SellerTIN": company.eims_tin,
-                "Invoices": [
-                    {
-                        "InvoiceIRN": self.eims_irn,
-                        "PaymentCoverage": "FULL",
-                        "InvoicePaidAmount": self.amount_total,
-                        "TotalAmount": self.amount_total,
-                    }
-                ],
-                "TransactionDetails": {
-                    "ModeOfPayment": "CASH",
-                    "CollectorName": self.env.user.name,
-                    "PaymentServiceProvider": "Bank",
-                    "AccountNumber": "123456789",
-                    "TransactionNumber": "TRX987654322"
-                }
-            }
+            payload = self._prepare_eims_receipt_payload()
 
             # Call EIMS API
             token, encryption_key = self.env['eims.auth'].get_eims_token()
@@ -1047,10 +1350,10 @@ class AccountMove(models.Model):
             url = param_obj.get_param('eims.api_sales.receipt_url',
                                       default='https://core.mor.gov.et/v1/receipt/sales')
 
-            # ⃣ SIGN request (service layer)
-            signed_payload = sign_eims_request(payload)
+            # ⃣ SIGN request (service layer), serialized once
+            request_body = build_eims_request(payload)
 
-            response = http.post(url, headers=headers, json=signed_payload, timeout=(5, 60))
+            response = http.post(url, headers=headers, data=request_body, timeout=(5, 60))
             res_json = response.json()
 
             _logger.info("==== EIMS Receipt Response ====")
@@ -1112,242 +1415,345 @@ class AccountMove(models.Model):
             _logger.error(f"EIMS Receipt Error for Invoice {self.name}: {repr(e)}")
             raise UserError(_("Failed to create EIMS receipt. Check logs."))
 
+    def _prepare_eims_receipt_payload(self, paid_amounts=None, receipt_counter=None):
+        """
+        Sales receipt payload covering the invoices of `self` (one company,
+        customer and currency). `paid_amounts` ({move_id: amount}) defaults
+        to the invoice totals; an amount below the total is sent as PARTIAL.
+        `receipt_counter` is a reserved 'eims.receipt.counter' number, one
+        is taken when not given.
+        """
+        company = self[0].company_id
+        currency = self[0].currency_id
+        if receipt_counter is None:
+            receipt_counter = self.with_company(company)._reserve_eims_sequence_numbers(
+                1, code='eims.receipt.counter')[0]
+        paid_amounts = paid_amounts or {}
+
+        invoice_items = []
+        for invoice in self:
+            paid = paid_amounts.get(invoice.id, invoice.amount_total)
+            partial = invoice.currency_id.compare_amounts(paid, invoice.amount_total) < 0
+            invoice_items.append({
+                "InvoiceIRN": invoice.eims_irn,
+                "PaymentCoverage": "PARTIAL" if partial else "FULL",
+                "InvoicePaidAmount": paid,
+                "TotalAmount": invoice.amount_total,
+            })
+
+        receipt_date = max(self.mapped('invoice_date'))
+        return {
+            "ReceiptNumber": f"REC{receipt_counter:016d}",
+            "ReceiptType": "Sales Receipts",
+            "Reason": "Payment for Invoice",
+            "ReceiptDate": receipt_date.strftime('%Y-%m-%dT%H:%M:%S') + "+03:00",
+            "ReceiptCounter": str(receipt_counter),
+            "ManualReceiptNumber": "98766",
+            "SourceSystemType": "POS",
+            "SourceSystemNumber": company.eims_system_number,
+            "ReceiptCurrency": currency.name,
+            "CollectedAmount": currency.round(sum(item["InvoicePaidAmount"] for item in invoice_items)),
+            "SellerTIN": company.eims_tin,
+            "Invoices": invoice_items,
+            "TransactionDetails": {
+                "ModeOfPayment": "CASH",
+                "CollectorName": self.env.user.name,
+                "PaymentServiceProvider": "Bank",
+                "AccountNumber": "123456789",
+                "TransactionNumber": f"TRX{receipt_counter:09d}"
+            }
+        }
+
+    def _get_eims_receipt_groups(self):
+        """
+        Group the payments of the invoices of `self` not receipted yet into
+        receipts: one per customer, currency and payment, with the amount
+        each payment covers on each invoice. Only actual payments count,
+        not credit notes or write-offs reconciled with the invoice; an
+        invoice without any reconciliation and without a receipt is taken
+        as paid in full, like action_create_eims_receipt does. Receipts are
+        capped at eims.receipt_max_invoices invoices.
+        Returns [(invoices, {move_id: paid_amount}, partial reconciliations)].
+        """
+        Partial = self.env['account.partial.reconcile']
+        amounts_by_key = defaultdict(dict)
+        partials_by_key = defaultdict(dict)
+        for invoice in self:
+            key = (invoice.company_id.id, invoice.commercial_partner_id.id, invoice.currency_id.id)
+            partials = invoice.line_ids.matched_credit_ids
+            if not partials:
+                if invoice.eims_receipt_status != 'success':
+                    amounts_by_key[key + (False,)][invoice.id] = invoice.amount_total
+                continue
+            for partial in partials:
+                if partial.eims_receipt_rrn or not partial._is_eims_receiptable_payment():
+                    continue
+                payment_key = key + (partial.credit_move_id.move_id.id,)
+                amounts = amounts_by_key[payment_key]
+                amounts[invoice.id] = amounts.get(invoice.id, 0.0) + partial.debit_amount_currency
+                partials_by_invoice = partials_by_key[payment_key]
+                partials_by_invoice[invoice.id] = partials_by_invoice.get(invoice.id, Partial) | partial
+
+        param_obj = self.env['ir.config_parameter'].sudo()
+        max_invoices = max(int(param_obj.get_param('eims.receipt_max_invoices', EIMS_RECEIPT_MAX_INVOICES)), 1)
+        groups = []
+        for payment_key, amounts in amounts_by_key.items():
+            invoices = self.browse(list(amounts))
+            partials_by_invoice = partials_by_key.get(payment_key, {})
+            for start in range(0, len(invoices), max_invoices):
+                group_invoices = invoices[start:start + max_invoices]
+                group_partials = Partial.union(*(partials_by_invoice.get(inv.id, Partial) for inv in group_invoices))
+                groups.append((group_invoices, amounts, group_partials))
+        return groups
+
+    def action_create_eims_receipts_batch(self):
+        """
+        Generate EIMS sales receipts for many invoices: one receipt per
+        customer and payment covering all its IRNs (see
+        _get_eims_receipt_groups), signed together and posted concurrently.
+        """
+        invoices = self.filtered(
+            lambda inv: inv.move_type == 'out_invoice' and inv.eims_irn and inv.eims_status != 'cancelled'
+        )
+        groups = invoices._get_eims_receipt_groups()
+        if not groups:
+            raise UserError("No payments of invoices registered in EIMS (not cancelled) without a receipt "
+                            "in the selection.")
+        invoices = self.browse().union(*(group_invoices for group_invoices, amounts, partials in groups))
+
+        param_obj = self.env['ir.config_parameter'].sudo()
+        max_workers = int(param_obj.get_param('eims.send_concurrency', EIMS_SEND_CONCURRENCY))
+        max_workers = min(max_workers, self.env['eims.auth']._get_http_pool_size())
+        url = param_obj.get_param('eims.api_sales.receipt_url',
+                                  default='https://core.mor.gov.et/v1/receipt/sales')
+
+        try:
+            http = self.env['eims.auth'].get_eims_http_session()
+            token, encryption_key = self.env['eims.auth'].get_eims_token()
+            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+            # Every receipt gets its own number, reserved per company before signing
+            counters = [None] * len(groups)
+            for company in invoices.company_id:
+                indexes = [i for i, (group_invoices, amounts, partials) in enumerate(groups)
+                           if group_invoices.company_id == company]
+                numbers = self.with_company(company)._reserve_eims_sequence_numbers(
+                    len(indexes), code='eims.receipt.counter')
+                for i, number in zip(indexes, numbers):
+                    counters[i] = number
+            request_bodies = sign_many([
+                group_invoices._prepare_eims_receipt_payload(amounts, counter)
+                for (group_invoices, amounts, partials), counter in zip(groups, counters)
+            ])
+        except Exception as e:
+            _logger.error(f"EIMS Receipt Batch Error: {repr(e)}")
+            raise UserError(_("Failed to create EIMS receipts. Check logs."))
+
+        results = _post_eims_requests(http, url, headers, request_bodies, max_workers, (5, 60))
+        receipt_count = failed_count = 0
+        for (group_invoices, amounts, partials), (status_code, res_json, error) in zip(groups, results):
+            if group_invoices._apply_eims_receipt_response(status_code, res_json, error, amounts, partials):
+                receipt_count += 1
+            else:
+                failed_count += 1
+
+        message = f"{receipt_count} EIMS receipt(s) created for {len(invoices)} invoice(s)"
+        if failed_count:
+            message += f", {failed_count} failed (check chatter)"
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': "EIMS",
+                'message': message,
+                'type': 'warning' if failed_count else 'success',
+                'sticky': bool(failed_count),
+            },
+        }
+
+    def _apply_eims_receipt_response(self, status_code, res_json, error, paid_amounts, partials=None):
+        """
+        Store the answer to a multi-invoice receipt request on its invoices
+        and mark the payment `partials` it covers as receipted. The invoice
+        fields show the latest receipt; a failure never hides an earlier
+        successful receipt.
+        """
+        now = fields.Datetime.now()
+        if not error and status_code == 200 and res_json.get("statusCode") == 200:
+            body = res_json.get("body", {})
+            rrn = body.get("rrn")
+            if partials:
+                partials.sudo().write({'eims_receipt_rrn': rrn})
+            self.write({
+                'eims_receipt_status': 'success',
+                'eims_receipt_rrn': rrn,
+                'eims_receipt_qr_code': body.get("qr"),
+            })
+            response = json.dumps(res_json, indent=2)
+            self.env['eims.receipt.log'].create([{
+                "move_id": invoice.id,
+                "partner_id": invoice.partner_id.id,
+                "rrn": rrn,
+                "receipt_date": now,
+                "status": 'success',
+                "amount_total": paid_amounts.get(invoice.id, invoice.amount_total),
+                "currency_id": invoice.currency_id.id,
+                "eims_receipt_qr_code": body.get("qr"),
+                "eims_response": response,
+            } for invoice in self])
+            for invoice in self:
+                invoice.message_post(body=f"✅ Receipt created successfully. RRN: {rrn}")
+                try:
+                    invoice._send_eims_receipt_email(force_send=False)
+                except Exception as e:
+                    invoice.message_post(body=f"⚠ Receipt auto-email failed: {e}")
+            return True
+
+        response = repr(error) if error else json.dumps(res_json, indent=2)
+        self.filtered(lambda inv: inv.eims_receipt_status != 'success').write({'eims_receipt_status': 'failed'})
+        self.env['eims.receipt.log'].create([{
+            "move_id": invoice.id,
+            "partner_id": invoice.partner_id.id,
+            "status": 'failed',
+            "amount_total": paid_amounts.get(invoice.id, invoice.amount_total),
+            "currency_id": invoice.currency_id.id,
+            "eims_response": response,
+        } for invoice in self])
+        for invoice in self:
+            invoice.message_post(body=f"❌ Receipt creation failed: {response}")
+        _logger.error(f"EIMS Receipt Error for {len(self)} invoice(s): {response}")
+        return False
+
     # --- Verify Invoice via EIMS ---
 
     def action_verify_invoice(self):
-        # Get the smart session
-        http = self.env['eims.auth'].get_eims_http_session()
         self.ensure_one()
         if not self.eims_irn:
             raise UserError("Invoice does not have an IRN yet.")
 
         try:
-            token, encryption_key = self.env['eims.auth'].get_eims_token()
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/json",
-                "Accept": "*/*"
-            }
-            payload = {"irn": self.eims_irn}
-            signed_payload = sign_eims_request(payload)
-            param_obj = self.env['ir.config_parameter'].sudo()
-            url = param_obj.get_param('eims.api_single.verify_url',
-                                      default='https://core.mor.gov.et/v1/verify')
-            response = http.post(url, json=signed_payload, headers=headers, timeout=(5, 30))
-            data = response.json()
+            data = self._fetch_eims_verify_data(self.eims_irn)
+            self._apply_eims_verify_response(data)
 
-            if data.get("statusCode") == 200 and data.get("message") == "SUCCESS":
-                body = data.get("body", {})
-
-                self.eims_verified = True
-                self.eims_verified_data = body or {}
-                self.eims_verification_status = body.get("status", body.get("Status", "ACTIVE"))
-                # self.eims_version = body.get("version", "1")
-                # self.eims_item_list = body.get("ItemList", {})
-                self.eims_document_number = body.get("DocumentDetails", {}).get("DocumentNumber")
-                doc_date = body.get("DocumentDetails", {}).get("Date")
-                if doc_date:
-                    self.eims_document_date = datetime.strptime(doc_date, "%d-%m-%YT%H:%M:%S")
-
-                val = body.get("ValueDetails", {})
-                self.eims_total_value = val.get("TotalValue") or 0.0
-                self.eims_tax_value = val.get("TaxValue") or 0.0
-                self.eims_invoice_currency = val.get("InvoiceCurrency") or ""
-
-                val = body.get("BuyerDetails", {})
-                self.eims_buyers_tin = val.get("Tin") or ""
-                self.eims_buyers_city_code = val.get("City") or ""
-                self.eims_buyers_region = val.get("Region") or ""
-                self.eims_buyers_wereda = val.get("Wereda") or ""
-                self.eims_buyers_id_type = val.get("IdType") or ""
-                self.eims_buyers_id_number = val.get("IdNumber") or ""
-                self.eims_buyers_legal_name = val.get("LegalName") or ""
-                self.eims_buyers_email = val.get("Email") or ""
-                self.eims_buyers_phone = val.get("Phone") or ""
-
-                val = body.get("SourceSystem", {})
-                self.eims_source_system = val.get("SourceSystem") or ""
-                self.eims_cashier_name = val.get("CashierName") or ""
-                self.eims_system_number = val.get("SystemNumber") or ""
-                self.eims_invoice_counter = val.get("InvoiceCounter") or ""
-                self.eims_sales_person_name = val.get("SalesPersonName") or ""
-
-                val = body.get("SellerDetails", {})
-                self.eims_seller_tin = val.get("Tin") or ""
-                self.eims_seller_city_code = val.get("City") or ""
-                self.eims_seller_region = val.get("Region") or ""
-                self.eims_seller_wereda = val.get("Wereda") or ""
-                # self.eims_seller_id_type = val.get("IdType") or ""
-                # self.eims_seller_id_number = val.get("IdNumber") or ""
-                self.eims_seller_legal_name = val.get("LegalName") or ""
-                self.eims_seller_email = val.get("Email") or ""
-                self.eims_seller_phone = val.get("Phone") or ""
-
-                val = body.get("PaymentDetails", {})
-                self.eims_payment_mode = val.get("PaymentMode") or ""
-                self.eims_payment_term = val.get("PaymentTerm") or ""
-
-                val = body.get("DocumentDetails", {})
-                self.eims_document_details = val.get("DocumentDetails", {}) or ""
-                self.eims_document_date = val.get("Date") or ""
-                self.eims_document_type = val.get("Type") or ""
-                self.eims_document_reason = val.get("Reason") or ""
-                self.eims_document_number = val.get("DocumentNumber") or ""
-
-                val = body.get("TransactionDetails", {})
-                self.eims_transaction_type = val.get("TransactionType") or ""
-                self.eims_reference_details = val.get("ReferenceDetails", {}) or ""
-                self.eims_previous_irn = val.get("PreviousIRN") or ""
+        except Exception as e:
+            self.message_post(body=f"⚠️ Verification Error: {str(e)}")
 
-            self.message_post(
-                body=f"✅ Invoice Verified via EIMS<br/>"
-                     f"IRN: {self.eims_irn}<br/>"
-                     f"Document No: {self.eims_document_number}"
-            )
+    def _apply_eims_verify_response(self, data):
+        """Store the MoR answer to a verify request on the invoice and its log."""
+        self.ensure_one()
 
-            log = self.env['eims.registered.invoice'].search([('move_id', '=', self.id)], limit=1)
-            values = {
-                "partner_id": self.partner_id.id,
-                "eims_irn": self.eims_irn,
-                "ack_date": self.eims_ack_date,
-                "status": "success",
-                "amount_total": self.amount_total,
-                "currency_id": self.currency_id.id,
+        if data.get("statusCode") == 200 and data.get("message") == "SUCCESS":
+            body = data.get("body", {})
+            VERIFY_BODY_MAP.apply(self, body, extra={
                 "eims_verified": True,
-                "eims_verified_data": self.eims_verified_data,
-                # "eims_buyer_details": self.eims_buyer_details,
-                # "eims_seller_details": self.eims_seller_details,
-                # "eims_value_details": self.eims_value_details,
-                "eims_total_value": self.eims_total_value,
-                "eims_tax_value": self.eims_tax_value,
-                "eims_invoice_currency": self.eims_invoice_currency,
-                # "eims_payment_details": self.eims_payment_details,
-                "eims_document_number": self.eims_document_number,
-                "eims_document_date": self.eims_document_date,
-                "eims_response": json.dumps(data, indent=2),
-                "eims_qr_code": self.eims_qr_code,
-                "eims_signed_invoice": self.eims_signed_invoice,
-                "eims_buyers_tin": self.eims_buyers_tin,
-                "eims_buyers_city_code": self.eims_buyers_city_code,
-                "eims_buyers_region": self.eims_buyers_region,
-                "eims_buyers_wereda": self.eims_buyers_wereda,
-                "eims_buyers_id_type": self.eims_buyers_id_type,
-                "eims_buyers_id_number": self.eims_buyers_id_number,
-                "eims_buyers_legal_name": self.eims_buyers_legal_name,
-                "eims_buyers_email": self.eims_buyers_email,
-                "eims_buyers_phone": self.eims_buyers_phone,
-                "eims_seller_tin": self.eims_seller_tin,
-                "eims_seller_city_code": self.eims_seller_city_code,
-                "eims_seller_region": self.eims_seller_region,
-                "eims_seller_wereda": self.eims_seller_wereda,
-                "eims_seller_legal_name": self.eims_seller_legal_name,
-                "eims_seller_email": self.eims_seller_email,
-                "eims_seller_phone": self.eims_seller_phone,
-                "eims_payment_mode": self.eims_payment_mode,
-                "eims_payment_term": self.eims_payment_term,
-                "eims_source_system": self.eims_source_system,
-                "eims_cashier_name": self.eims_cashier_name,
-                "eims_system_number": self.eims_system_number,
-                "eims_invoice_counter": self.eims_invoice_counter,
-                "eims_sales_person_name": self.eims_sales_person_name,
-                # "eims_document_details": self.eims_document_details,
-                "eims_transaction_type": self.eims_transaction_type,
-                "eims_reference_details": self.eims_reference_details,
-                "eims_previous_irn": self.eims_previous_irn,
+                "eims_verified_data": body or {},
+                "eims_verification_status": body.get("status", body.get("Status", "ACTIVE")),
+            })
 
-            }
-            if log:
-                log.write(values)
-            else:
-                self.env['eims.registered.invoice'].create(values)
+        self.message_post(
+            body=f"✅ Invoice Verified via EIMS<br/>"
+                 f"IRN: {self.eims_irn}<br/>"
+                 f"Document No: {self.eims_document_number}"
+        )
 
-        except Exception as e:
-            self.message_post(body=f"⚠️ Verification Error: {str(e)}")
+        log = self.env['eims.registered.invoice'].search([('move_id', '=', self.id)], limit=1)
+        values = {
+            "partner_id": self.partner_id.id,
+            "eims_irn": self.eims_irn,
+            "ack_date": self.eims_ack_date,
+            "status": "success",
+            "amount_total": self.amount_total,
+            "currency_id": self.currency_id.id,
+            "eims_verified": True,
+            "eims_verified_data": self.eims_verified_data,
+            # "eims_buyer_details": self.eims_buyer_details,
+            # "eims_seller_details": self.eims_seller_details,
+            # "eims_value_details": self.eims_value_details,
+            "eims_total_value": self.eims_total_value,
+            "eims_tax_value": self.eims_tax_value,
+            "eims_invoice_currency": self.eims_invoice_currency,
+            # "eims_payment_details": self.eims_payment_details,
+            "eims_document_number": self.eims_document_number,
+            "eims_document_date": self.eims_document_date,
+            "eims_response": json.dumps(data, indent=2),
+            "eims_qr_code": self.eims_qr_code,
+            "eims_signed_invoice": self.eims_signed_invoice,
+            "eims_buyers_tin": self.eims_buyers_tin,
+            "eims_buyers_city_code": self.eims_buyers_city_code,
+            "eims_buyers_region": self.eims_buyers_region,
+            "eims_buyers_wereda": self.eims_buyers_wereda,
+            "eims_buyers_id_type": self.eims_buyers_id_type,
+            "eims_buyers_id_number": self.eims_buyers_id_number,
+            "eims_buyers_legal_name": self.eims_buyers_legal_name,
+            "eims_buyers_email": self.eims_buyers_email,
+            "eims_buyers_phone": self.eims_buyers_phone,
+            "eims_seller_tin": self.eims_seller_tin,
+            "eims_seller_city_code": self.eims_seller_city_code,
+            "eims_seller_region": self.eims_seller_region,
+            "eims_seller_wereda": self.eims_seller_wereda,
+            "eims_seller_legal_name": self.eims_seller_legal_name,
+            "eims_seller_email": self.eims_seller_email,
+            "eims_seller_phone": self.eims_seller_phone,
+            "eims_payment_mode": self.eims_payment_mode,
+            "eims_payment_term": self.eims_payment_term,
+            "eims_source_system": self.eims_source_system,
+            "eims_cashier_name": self.eims_cashier_name,
+            "eims_system_number": self.eims_system_number,
+            "eims_invoice_counter": self.eims_invoice_counter,
+            "eims_sales_person_name": self.eims_sales_person_name,
+            # "eims_document_details": self.eims_document_details,
+            "eims_transaction_type": self.eims_transaction_type,
+            "eims_reference_details": self.eims_reference_details,
+            "eims_previous_irn": self.eims_previous_irn,
+
+        }
+        if log:
+            write_changed(log, values)
+        else:
+            self.env['eims.registered.invoice'].create(values)
 
     def action_bulk_send_to_eims(self):
-        # Get the smart session
-        http = self.env['eims.auth'].get_eims_http_session()
-        """Bulk send all selected invoices (already filtered in view) and log responses individually."""
+        """
+        Bulk send the selected invoices in chunks (eims.bulk_chunk_size),
+        one eims.bulk.conversation per chunk, see its _dispatch(). Failed
+        chunks can be retried from EIMS > Bulk Conversations.
+        """
         if not self:
             raise UserError("No invoices selected for bulk sending.")
 
-        company = self.env.company
+        invoices = self.filtered(
+            lambda inv: inv.move_type == "out_invoice" and inv.state == "posted" and not inv.eims_irn
+        )
+        if not invoices:
+            raise UserError("No valid invoices to send to EIMS.")
 
-        # ----------------------------
-        # Authenticate
-        # ----------------------------
+        # Fail early, before any chunk is created
         try:
-            token, encryption_key = self.env['eims.auth'].get_eims_token()
+            self.env['eims.auth'].get_eims_token()
         except Exception as e:
             raise UserError(f"❌ Failed to authenticate with EIMS: {str(e)}")
 
-        # ----------------------------
-        # Callback URL
-        # ----------------------------
-        callback_url = self.env["ir.config_parameter"].sudo().get_param(
-            "eims.callback.url"
-        ) or "https://91.99.115.196/eims/bulk-callback"
+        conversations = self.env['eims.bulk.conversation'].sudo()._create_chunks(invoices)
+        self.env.cr.commit()
+        conversations._dispatch()
 
-        # ----------------------------
-        # Headers
-        # ----------------------------
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "TIN": company.eims_tin,
-            "SystemNumber": company.eims_system_number,
-            "CallbackURL": callback_url,
-            "Content-Type": "application/json",
+        failed = conversations.filtered(lambda c: c.state == "failed")
+        _logger.info("📌 %s bulk chunk(s) sent, %s failed", len(conversations) - len(failed), len(failed))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': "EIMS",
+                'message': (
+                    f"{len(invoices)} invoice(s) sent in {len(conversations)} chunk(s), "
+                    f"{len(failed)} chunk(s) failed and can be retried from Bulk Conversations."
+                    if failed else
+                    f"{len(invoices)} invoice(s) sent in {len(conversations)} chunk(s). Awaiting callback."
+                ),
+                'type': 'warning' if failed else 'success',
+                'sticky': bool(failed),
+            },
         }
 
-        # ----------------------------
-        # Build payload list
-        # ----------------------------
-        payload_list = []
-        for invoice in self:
-            if invoice.move_type != "out_invoice" or invoice.state != "posted":
-                continue
-
-            payload_item = invoice.prepare_eims_payload_single()
-
-            # ✅ Correct path
-            doc_no = str(payload_item["DocumentDetails"]["DocumentNumber"])
-
-            # Save mapping for callback
-            self.env['eims.bulk.mapping'].sudo().create({
-                'document_number': doc_no,
-                'invoice_id': invoice.id,
-            })
-
-            _logger.warning("📌 Mapping saved: document_number=%s (type=%s)",
-                            doc_no, type(doc_no).__name__)
-
-            payload_list.append(payload_item)
-
-        if not payload_list:
-            raise UserError("No valid invoices to send to EIMS.")
-
-        # ----------------------------
-        # Call EIMS bulk API
-        # ----------------------------
-        try:
-            signed_payload_list = sign_eims_request(payload_list)
-            response = http.post(callback_url, headers=headers, json=signed_payload_list, timeout=(5, 60))
-            res_json = response.json()
-
-            _logger.info("📨 RAW EIMS Bulk Response: %s", json.dumps(res_json, indent=4))
-            conversation_id = res_json.get("conversationId", "pending")
-
-            # Log each invoice individually
-            for invoice in self:
-                invoice.message_post(
-                    body=f"📨 Bulk EIMS sent. Awaiting callback.\nConversation ID: {conversation_id}"
-                )
-
-        except Exception as e:
-            for invoice in self:
-                invoice.message_post(body=f"❌ Bulk EIMS Error: {str(e)}")
-            raise UserError(f"❌ Bulk EIMS Failed: {str(e)}")
-
     def action_view_unregistered_eims_invoices(self):
         """Show invoices missing IRN and not expired (within 72 hours)."""
         limit_time = fields.Datetime.now() - timedelta(hours=72)
@@ -1428,12 +1834,11 @@ class AccountMove(models.Model):
             'context': {'default_move_type': 'out_invoice'},
         }
 
-    def action_bulk_cancel_eims(self):
-        # Get the smart session
-        http = self.env['eims.auth'].get_eims_http_session()
+    def action_bulk_cancel_eims(self, reason_code="1", remark="Bulk Cancellation via Odoo"):
         """
-        Refactored to handle batch cancellation, individual logging,
-        and individual email notifications for each invoice.
+        Cancel the selected invoices through /v1/bulkCancel, in chunks of
+        eims.bulk_cancel_chunk_size (see _eims_bulk_cancel), with
+        individual logging and email notifications for each invoice.
         """
         if not self:
             raise UserError("No invoices selected.")
@@ -1442,90 +1847,119 @@ class AccountMove(models.Model):
         if not valid_invoices:
             raise UserError("Selected invoices must have an IRN to be cancelled.")
 
-        # 1. Prepare batch items
-        items_to_cancel = []
-        for invoice in valid_invoices:
-            items_to_cancel.append({
-                "Irn": invoice.eims_irn,
-                "ReasonCode": "1",
-                "Remark": "Bulk Cancellation via Odoo",
-            })
+        outcomes = valid_invoices._eims_bulk_cancel(reason_code, remark)
+        if not any(ok for ok, msg in outcomes.values()):
+            raise UserError(f"EIMS API Error: {next(iter(outcomes.values()))[1]}")
 
-        try:
-            # 2. Setup Secure Connection
-            token, _ = self.env['eims.auth'].get_eims_token()
-            param_obj = self.env['ir.config_parameter'].sudo()
-            url = param_obj.get_param('eims.api_bulk.cancel_url',
-                                      default='https://core.mor.gov.et/v1/bulkCancel')
+        return self.action_view_sent_eims_invoices()
 
+    def _eims_bulk_cancel(self, reason_code="1", remark=""):
+        """
+        Cancel the invoices of `self` (all with an IRN) with one reason.
+        The IRNs are sent in chunks of eims.bulk_cancel_chunk_size, signed
+        together and posted concurrently (eims.send_concurrency). One chunk
+        failing does not stop the others.
+        Returns {move_id: (success, message)}.
+        """
+        param_obj = self.env['ir.config_parameter'].sudo()
+        chunk_size = max(int(param_obj.get_param('eims.bulk_cancel_chunk_size', EIMS_BULK_CANCEL_CHUNK_SIZE)), 1)
+        max_workers = int(param_obj.get_param('eims.send_concurrency', EIMS_SEND_CONCURRENCY))
+        max_workers = min(max_workers, self.env['eims.auth']._get_http_pool_size())
+        url = param_obj.get_param('eims.api_bulk.cancel_url',
+                                  default='https://core.mor.gov.et/v1/bulkCancel')
+
+        chunks = [self[start:start + chunk_size] for start in range(0, len(self), chunk_size)]
+        outcomes = {}
+        try:
+            http = self.env['eims.auth'].get_eims_http_session()
+            token, _encryption_key = self.env['eims.auth'].get_eims_token()
             headers = {
                 "Authorization": f"Bearer {token}",
                 "Content-Type": "application/json",
             }
+            request_bodies = sign_many([
+                [{"Irn": inv.eims_irn, "ReasonCode": reason_code, "Remark": remark} for inv in chunk]
+                for chunk in chunks
+            ])
+        except Exception as e:
+            results = [(None, None, e)] * len(chunks)
+        else:
+            results = _post_eims_requests(http, url, headers, request_bodies, max_workers, (5, 60))
+        for chunk, (status_code, data, error) in zip(chunks, results):
+            if error:
+                _logger.error(f"EIMS Bulk Cancel Crash: {str(error)}")
+                data = {"message": f"System Error: {str(error)}"}
+            outcomes.update(chunk._apply_eims_bulk_cancel_response(status_code, data or {}, reason_code))
+        return outcomes
+
+    def _apply_eims_bulk_cancel_response(self, status_code, data, reason_code):
+        """Apply a /v1/bulkCancel answer to the invoices of its chunk."""
+        outcomes = {}
+        if status_code == 200 and data.get("statusCode") == 200:
+            invoice_by_irn = {inv.eims_irn: inv for inv in self}
+            matched = []
+            for res_item in data.get("body", []):
+                inv = invoice_by_irn.pop(res_item.get('Irn'), None)
+                if inv:
+                    matched.append((inv, res_item))
+
+            cancelled = self.browse([inv.id for inv, res_item in matched])
+            self._invalidate_eims_verify_cache(cancelled.mapped('eims_irn'))
+
+            # Update Invoice State, one write per cancel message
+            now = fields.Datetime.now()
+            invoices_by_message = defaultdict(lambda: self.browse())
+            for inv, res_item in matched:
+                invoices_by_message[res_item.get('Remark', 'Bulk Cancelled')] |= inv
+            for message, invoices in invoices_by_message.items():
+                invoices.write({
+                    'eims_status': 'cancelled',
+                    'eims_cancelled': True,
+                    'eims_cancel_date': now,
+                    'eims_cancel_message': message,
+                })
 
-            # 3. Sign and Post
-            signed_payload = sign_eims_request(items_to_cancel)
-            response = http.post(url, json=signed_payload, headers=headers, timeout=(5, 60))
-            data = response.json()
-
-            # 4. Handle Success Response
-            if response.status_code == 200 and data.get("statusCode") == 200:
-                results = data.get("body", [])
-
-                for res_item in results:
-                    # Isolate the specific singleton record
-                    target_inv = valid_invoices.filtered(lambda i: i.eims_irn == res_item.get('Irn'))
-
-                    if target_inv:
-                        # Fix: Ensure we are working with one record (ID 500 then 479)
-                        inv = target_inv[0]
-
-                        # Update Invoice State
-                        inv.write({
-                            'eims_status': 'cancelled',
-                            'eims_cancelled': True,
-                            'eims_cancel_date': fields.Datetime.now(),
-                            'eims_cancel_message': res_item.get('Remark', 'Bulk Cancelled'),
-                        })
-
-                        # Create Individual Log Entry
-                        self.env["eims.cancel.log"].create({
-                            "move_id": inv.id,
-                            "partner_id": inv.partner_id.id,
-                            "eims_irn": inv.eims_irn,
-                            "reason_code": res_item.get("ReasonCode", "1"),
-                            "remark": res_item.get("Remark", "Bulk Cancellation"),
-                            "status": "success",
-                            "cancellation_date": fields.Datetime.now(),
-                            "eims_response": json.dumps(res_item, indent=2),
-                            "eims_cancelled": True,
-                            "eims_cancel_date": fields.Datetime.now(),
-                        })
-
-                        # --- INDIVIDUAL EMAIL LOGIC (Inside Success Loop) ---
-                        try:
-                            inv._send_eims_cancelled_email()
-                            inv.message_post(body="✅ EIMS Cancellation email sent to student.")
-                        except Exception as email_err:
-                            inv.message_post(body=f"⚠ Cancellation email failed: {email_err}")
-
-                        inv.message_post(body=f"✅ EIMS Bulk Cancelled. MoR ID: {res_item.get('id')}")
-
-            else:
-                # Handle Batch Failure
-                for inv in valid_invoices:
-                    self.env["eims.cancel.log"].create({
-                        "move_id": inv.id,
-                        "status": "failed",
-                        "eims_response": json.dumps(data, indent=2),
-                    })
-                raise UserError(f"EIMS API Error: {data.get('message', 'SCHEMA_ERROR')}")
+            # Create the Individual Log Entries at once
+            self.env["eims.cancel.log"].create([{
+                "move_id": inv.id,
+                "partner_id": inv.partner_id.id,
+                "eims_irn": inv.eims_irn,
+                "reason_code": res_item.get("ReasonCode", reason_code),
+                "remark": res_item.get("Remark", "Bulk Cancellation"),
+                "status": "success",
+                "cancellation_date": now,
+                "eims_response": json.dumps(res_item, indent=2),
+                "eims_cancelled": True,
+                "eims_cancel_date": now,
+            } for inv, res_item in matched])
+
+            for inv, res_item in matched:
+                # --- INDIVIDUAL EMAIL LOGIC (queued, sent by the mail cron) ---
+                try:
+                    inv._send_eims_cancelled_email(force_send=False)
+                    inv.message_post(body="✅ EIMS Cancellation email sent to student.")
+                except Exception as email_err:
+                    inv.message_post(body=f"⚠ Cancellation email failed: {email_err}")
 
-        except Exception as e:
-            _logger.error(f"EIMS Bulk Cancel Crash: {str(e)}")
-            raise UserError(f"System Error: {str(e)}")
+                inv.message_post(body=f"✅ EIMS Bulk Cancelled. MoR ID: {res_item.get('id')}")
+                outcomes[inv.id] = (True, "Cancelled")
 
-        return self.action_view_sent_eims_invoices()
+            for inv in invoice_by_irn.values():
+                outcomes[inv.id] = (False, "IRN missing from the EIMS bulk cancel answer.")
+                inv.message_post(body="❌ EIMS Cancellation Failed: IRN missing from the bulk cancel answer.")
+        else:
+            # Handle Batch Failure
+            message = data.get('message', 'SCHEMA_ERROR')
+            response = json.dumps(data, indent=2)
+            self.env["eims.cancel.log"].create([{
+                "move_id": inv.id,
+                "status": "failed",
+                "eims_response": response,
+            } for inv in self])
+            for inv in self:
+                inv.message_post(body=f"❌ EIMS Cancellation Failed: {message}")
+                outcomes[inv.id] = (False, message)
+        return outcomes
 
     # def action_bulk_cancel_eims(self):
     #     """Bulk cancel invoices in EIMS system"""
@@ -1551,7 +1985,7 @@ class AccountMove(models.Model):
 
         try:
             # Get EIMS token
-            token, _ = self.env['eims.auth'].get_eims_token()
+            token, _encryption_key = self.env['eims.auth'].get_eims_token()
             param_obj = self.env['ir.config_parameter'].sudo()
             url = param_obj.get_param('eims.api_single.cancel_url',
                                       default='https://core.mor.gov.et/v1/cancel')
@@ -1567,11 +2001,12 @@ class AccountMove(models.Model):
 
             # Send cancellation request
             # ⃣ SIGN request (service layer)
-            signed_payload = sign_eims_request(payload)
-            response = http.post(url, json=signed_payload, headers=headers, timeout=(5, 30))
+            request_body = build_eims_request(payload)
+            response = http.post(url, data=request_body, headers=headers, timeout=(5, 30))
             data = response.json()
 
             if data.get("statusCode") == 200:
+                self._invalidate_eims_verify_cache([self.eims_irn])
                 cancel_date = data["body"].get("cancellationDate", "")
                 self.eims_cancelled = True
                 self.eims_cancel_date = fields.Datetime.now()
@@ -1669,31 +2104,148 @@ class AccountMove(models.Model):
             )
 
     def get_tax_code(self, tax):
-        name = (tax.description or tax.name or "").upper()
+        """EIMS tax code of `tax`, looked up in the per-company cached table."""
+        Tax = self.env['account.tax']
+        entry = Tax._get_eims_tax_code_map(tax.company_id.id).get(tax.id)
+        return entry[0] if entry else Tax._eims_tax_code_from_label(tax)
 
-        if "15%" in name:
-            return "VAT15"
-        if "0%" in name:
-            return "VAT0"
-        if "EX" in name:  # catches 0%EXEPT, 0%EXEMPT, EXEMPT, etc.
-            return "VATEX"
+    def _prepare_eims_item_list(self, include_harmonization=True):
+        """
+        Value the invoice lines with the shared engine (services.eims_valuation)
+        and return (ItemList, Totals). Used by invoices and credit memos alike.
+        """
+        self.ensure_one()
+        lines = self.invoice_line_ids
+        tax_map = self.env['account.tax']._get_eims_tax_code_map(self.company_id.id)
+
+        # (tax code, VAT rate) of each line's first tax, None when untaxed
+        line_taxes = []
+        for line in lines:
+            tax = line.tax_ids[:1]
+            if not tax:
+                line_taxes.append(None)
+            elif tax.id in tax_map:
+                line_taxes.append(tax_map[tax.id])
+            else:
+                line_taxes.append((self.get_tax_code(tax), tax.amount))
+
+        values, totals = value_lines(
+            LineInput(
+                line.price_subtotal, line.price_unit, line.quantity, line.discount,
+                line.x_excise_rate,
+                line_tax[1] if line_tax else None,
+                line.withholding_eims,
+            )
+            for line, line_tax in zip(lines, line_taxes)
+        )
 
-        # fallback
-        return "VAT0"
+        item_list = []
+        for idx, (line, line_tax, value) in enumerate(zip(lines, line_taxes, values), start=1):
+            item = {
+                "Discount": float(value.discount),
+                "NatureOfSupplies": "goods",
+                "ItemCode": line.product_id.default_code or str(line.id),
+                "ProductDescription": line.name,
+                "PreTaxValue": float(value.pre_tax),
+                "Quantity": line.quantity,
+                "LineNumber": idx,
+                "TaxAmount": float(value.vat),
+                "TaxCode": line_tax[0] if line_tax else "VAT0",
+                "TotalLineAmount": float(value.total),
+                "Unit": "PCS",
+                "UnitPrice": float(line.price_unit),
+            }
+            if include_harmonization:
+                item["HarmonizationCode"] = line.x_harmonization_code or "0000"
+            item["ExciseTaxValue"] = float(value.excise)
+            item_list.append(item)
+
+        return item_list, totals
 
     # prepare payload for single invoice
 
-    from decimal import Decimal, ROUND_HALF_UP
+    def _reserve_eims_sequence_numbers(self, count, code='eims.invoice.counter'):
+        """
+        Reserve `count` consecutive numbers of sequence `code` in one
+        database round trip instead of one next_by_code() call per invoice.
+        """
+        if count <= 1:
+            return [int(self.env['ir.sequence'].next_by_code(code) or 0)
+                    for _i in range(count)]
+
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', code),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence or sequence.use_date_range:
+            return [int(self.env['ir.sequence'].next_by_code(code) or 0)
+                    for _i in range(count)]
+
+        if sequence.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % sequence.id, count),
+            )
+            numbers = sorted(row[0] for row in self.env.cr.fetchall())
+        else:
+            step = sequence.number_increment
+            self.env.cr.execute(
+                "UPDATE ir_sequence SET number_next = number_next + %s WHERE id = %s RETURNING number_next",
+                (step * count, sequence.id),
+            )
+            first = self.env.cr.fetchone()[0] - step * count
+            numbers = [first + step * i for i in range(count)]
+            sequence.invalidate_recordset(['number_next'])
+
+        return [int(sequence.get_next_char(number) or 0) for number in numbers]
+
+    def prepare_eims_payloads(self):
+        """
+        Set-based variant of prepare_eims_payload_single(): prefetches lines,
+        taxes, products and partners for the whole recordset, reserves one
+        block of sequence numbers, then yields the payloads in the order of
+        `self`.
+        """
+        if not self:
+            return
+
+        self._prefetch_eims_payload_data()
+        sequence_numbers = self._reserve_eims_sequence_numbers(len(self))
+        for invoice, sequence_number in zip(self, sequence_numbers):
+            yield invoice._prepare_eims_payload(sequence_number)
+
+    def _prefetch_eims_payload_data(self):
+        """Load everything _prepare_eims_payload() reads, for all of `self`."""
+        lines = self.invoice_line_ids
+        lines.fetch([
+            'price_subtotal', 'price_unit', 'quantity', 'discount', 'name',
+            'x_excise_rate', 'withholding_eims', 'x_harmonization_code',
+            'product_id', 'tax_ids',
+        ])
+        lines.product_id.fetch(['default_code'])
+        lines.tax_ids.fetch(['amount', 'description', 'name'])
+        partners = self.partner_id | self.partner_id.commercial_partner_id
+        partners.fetch([
+            'name', 'company_type', 'commercial_partner_id', 'eims_tin', 'eims_vat_number',
+            'eims_id_number', 'phone', 'email', 'eims_buyers_city_code', 'eims_region',
+            'eims_wereda',
+        ])
 
     def prepare_eims_payload_single(self):
         self.ensure_one()
-        company = self.env.company
-        partner = self.partner_id
 
         # ----------------------------
         # Generate sequence number
         # ----------------------------
-        sequence_number = int(self.env['ir.sequence'].next_by_code('eims.invoice.counter') or 0)
+        sequence_number = self._reserve_eims_sequence_numbers(1)[0]
+        return self._prepare_eims_payload(sequence_number)
+
+    def _prepare_eims_payload(self, sequence_number):
+        """Build the single-invoice register payload for a reserved number."""
+        self.ensure_one()
+        company = self.company_id
+        partner = self.partner_id
+
         self.eims_document_number = sequence_number
         self.eims_invoice_counter = sequence_number
 
@@ -1710,78 +2262,9 @@ class AccountMove(models.Model):
             buyer_vat = partner.eims_vat_number
 
         # ----------------------------
-        # Initialize totals
+        # Value invoice lines (shared engine)
         # ----------------------------
-        item_list = []
-        total_discount = Decimal('0.00')
-        total_vat = Decimal('0.00')
-        total_wh = Decimal('0.00')
-        total_value = Decimal('0.00')
-        total_excise = Decimal('0.00')
-
-        # ----------------------------
-        # LOOP over invoice lines
-        # ----------------------------
-        for idx, line in enumerate(self.invoice_line_ids, start=1):
-            pre_tax = Decimal(str(line.price_subtotal))  # already after discount
-
-            # Excise calculation including discount
-            excise_value = Decimal('0.00')
-            if line.x_excise_rate:
-                line_total_before_tax = (Decimal(str(line.price_unit)) * Decimal(str(line.quantity)) *
-                                         (Decimal('1.0') - Decimal(str(line.discount or 0)) / Decimal('100')))
-                excise_value = (line_total_before_tax * Decimal(str(line.x_excise_rate)) / Decimal('100')).quantize(
-                    Decimal('0.01'), ROUND_HALF_UP)
-
-            # VAT calculation
-            vat_rate = Decimal('0.00')
-            if line.tax_ids:
-                vat_rate = Decimal(str(line.tax_ids[0].amount)) / Decimal('100')
-
-            # VAT amount = ((PreTaxValue + ExciseTaxValue) * VAT rate) + ExciseTaxValue
-            vat_amount = ((pre_tax + excise_value) * vat_rate + excise_value).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Withholding
-            wh_amount = Decimal('0.00')
-            if line.withholding_eims:
-                wh_amount = (pre_tax * Decimal('0.03')).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Determine EIMS tax code
-            tax_code = "VAT0"
-            if line.tax_ids:
-                tax_code = self.get_tax_code(line.tax_ids[0])
-
-            # Line discount
-            line_discount = (Decimal(str(line.price_unit)) * Decimal(str(line.quantity)) * Decimal(
-                str(line.discount)) / Decimal('100')).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Total line including VAT and Excise
-            total_line = (pre_tax + vat_amount).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Aggregate totals
-            total_discount += line_discount
-            total_vat += vat_amount
-            total_wh += wh_amount
-            total_excise += excise_value
-            total_value += total_line
-
-            # Append item
-            item_list.append({
-                "Discount": float(line_discount),
-                "NatureOfSupplies": "goods",
-                "ItemCode": line.product_id.default_code or str(line.id),
-                "ProductDescription": line.name,
-                "PreTaxValue": float(pre_tax),
-                "Quantity": line.quantity,
-                "LineNumber": idx,
-                "TaxAmount": float(vat_amount),
-                "TaxCode": tax_code,
-                "TotalLineAmount": float(total_line),
-                "Unit": "PCS",
-                "UnitPrice": float(line.price_unit),
-                "HarmonizationCode": line.x_harmonization_code or "0000",
-                "ExciseTaxValue": float(excise_value),
-            })
+        item_list, totals = self._prepare_eims_item_list()
 
         # ----------------------------
         # FINAL PAYLOAD
@@ -1831,11 +2314,11 @@ class AccountMove(models.Model):
             },
             "TransactionType": transaction_type,
             "ValueDetails": {
-                "Discount": float(total_discount),
-                "TaxValue": float(total_vat),
-                "IncomeWithholdValue": float(total_wh),
-                "TotalValue": float(total_value),
-                "ExciseValue": float(total_excise),
+                "Discount": float(totals.discount),
+                "TaxValue": float(totals.vat),
+                "IncomeWithholdValue": float(totals.withholding),
+                "TotalValue": float(totals.total),
+                "ExciseValue": float(totals.excise),
                 "TransactionWithholdValue": 0.0,
                 "InvoiceCurrency": self.currency_id.name,
             },
@@ -1846,7 +2329,7 @@ class AccountMove(models.Model):
     def prepare_eims_payload_credit_memo(self):
         """Prepare EIMS payload for a credit memo (CRE) linked to an original invoice"""
         self.ensure_one()
-        company = self.env.company
+        company = self.company_id
         partner = self.partner_id
 
         if not self.reversed_entry_id or not self.reversed_entry_id.eims_irn:
@@ -1858,64 +2341,8 @@ class AccountMove(models.Model):
         self.eims_document_number = sequence_number
         self.eims_invoice_counter = sequence_number
 
-        # Initialize totals
-        item_list = []
-        total_discount = Decimal('0.00')
-        total_vat = Decimal('0.00')
-        total_wh = Decimal('0.00')
-        total_value = Decimal('0.00')
-        total_excise = Decimal('0.00')
-
-        # Loop over invoice lines
-        for idx, line in enumerate(self.invoice_line_ids, start=1):
-            pre_tax = Decimal(str(line.price_subtotal))
-
-            # Excise
-            excise_value = Decimal('0.00')
-            if line.x_excise_rate:
-                line_total_before_tax = (Decimal(str(line.price_unit)) * Decimal(str(line.quantity)) *
-                                         (Decimal('1.0') - Decimal(str(line.discount or 0)) / Decimal('100')))
-                excise_value = (line_total_before_tax * Decimal(str(line.x_excise_rate)) / Decimal('100')).quantize(
-                    Decimal('0.01'), ROUND_HALF_UP)
-
-            # VAT
-            vat_rate = Decimal(str(line.tax_ids[0].amount)) / Decimal('100') if line.tax_ids else Decimal('0.00')
-            vat_amount = ((pre_tax + excise_value) * vat_rate + excise_value).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Withholding
-            wh_amount = (pre_tax * Decimal('0.03')).quantize(Decimal('0.01'),
-                                                             ROUND_HALF_UP) if line.withholding_eims else Decimal(
-                '0.00')
-
-            # Line discount
-            line_discount = (Decimal(str(line.price_unit)) * Decimal(str(line.quantity)) * Decimal(
-                str(line.discount)) / Decimal('100')).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Total line including VAT & Excise
-            total_line = (pre_tax + vat_amount).quantize(Decimal('0.01'), ROUND_HALF_UP)
-
-            # Append item
-            item_list.append({
-                "Discount": float(line_discount),
-                "NatureOfSupplies": "goods",
-                "ItemCode": line.product_id.default_code or str(line.id),
-                "ProductDescription": line.name,
-                "PreTaxValue": float(pre_tax),
-                "Quantity": line.quantity,
-                "LineNumber": idx,
-                "TaxAmount": float(vat_amount),
-                "TaxCode": "VAT15" if line.tax_ids else "VAT0",
-                "TotalLineAmount": float(total_line),
-                "Unit": "PCS",
-                "UnitPrice": float(line.price_unit),
-                "ExciseTaxValue": float(excise_value),
-            })
-
-            total_discount += line_discount
-            total_vat += vat_amount
-            total_wh += wh_amount
-            total_value += total_line
-            total_excise += excise_value
+        # Value credit memo lines (shared engine)
+        item_list, totals = self._prepare_eims_item_list(include_harmonization=False)
 
         # Final payload
         return {
@@ -1965,11 +2392,11 @@ class AccountMove(models.Model):
             },
             "TransactionType": "B2B",
             "ValueDetails": {
-                "Discount": float(total_discount),
-                "TaxValue": float(total_vat),
-                "IncomeWithholdValue": float(total_wh),
-                "TotalValue": float(total_value),
-                "ExciseValue": float(total_excise),
+                "Discount": float(totals.discount),
+                "TaxValue": float(totals.vat),
+                "IncomeWithholdValue": float(totals.withholding),
+                "TotalValue": float(totals.total),
+                "ExciseValue": float(totals.excise),
                 "TransactionWithholdValue": 0.0,
                 "InvoiceCurrency": self.currency_id.name,
             },
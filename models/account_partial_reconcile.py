@@ -0,0 +1,16 @@
+from odoo import models, fields
+
+
+class AccountPartialReconcile(models.Model):
+    _inherit = "account.partial.reconcile"
+
+    # Sales receipts are issued per payment: the RRN marks the part of an
+    # invoice a payment settled as receipted, so only later payments of a
+    # partially paid invoice are sent again.
+    eims_receipt_rrn = fields.Char(string="EIMS Receipt RRN", copy=False)
+
+    def _is_eims_receiptable_payment(self):
+        """Settled by an actual payment (payment or bank statement line), not by a credit note or write-off."""
+        self.ensure_one()
+        payment_line = self.credit_move_id
+        return bool(payment_line.payment_id or payment_line.statement_line_id)
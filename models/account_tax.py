@@ -0,0 +1,67 @@
+from types import MappingProxyType
+
+from odoo import api, fields, models, tools
+
+EIMS_TAX_CODES = [
+    ('VAT15', 'VAT 15%'),
+    ('VAT0', 'VAT 0%'),
+    ('VATEX', 'VAT Exempt'),
+]
+
+# Changing any of these fields can change the EIMS tax code of a tax
+EIMS_TAX_CODE_FIELDS = {'name', 'description', 'amount', 'company_id', 'eims_tax_code'}
+
+
+class AccountTax(models.Model):
+    _inherit = 'account.tax'
+
+    eims_tax_code = fields.Selection(
+        EIMS_TAX_CODES,
+        string="EIMS Tax Code",
+        help="Tax code sent to EIMS. When empty, it is derived from the tax label."
+    )
+
+    @api.model
+    def _eims_tax_code_from_label(self, tax):
+        name = (tax.description or tax.name or "").upper()
+
+        if "15%" in name:
+            return "VAT15"
+        if "0%" in name:
+            return "VAT0"
+        if "EX" in name:  # catches 0%EXEPT, 0%EXEMPT, EXEMPT, etc.
+            return "VATEX"
+
+        # fallback
+        return "VAT0"
+
+    @api.model
+    @tools.ormcache('company_id', 'self.env.lang')
+    def _get_eims_tax_code_map(self, company_id):
+        """
+        {tax id: (EIMS tax code, VAT rate %)} for every tax of the company.
+        Built once per company and cleared whenever a tax changes; the
+        cached map is shared by every caller, hence read-only.
+        """
+        taxes = self.sudo().with_context(active_test=False).search([('company_id', '=', company_id)])
+        return MappingProxyType({
+            tax.id: (tax.eims_tax_code or self._eims_tax_code_from_label(tax), tax.amount)
+            for tax in taxes
+        })
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        taxes = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return taxes
+
+    def write(self, vals):
+        res = super().write(vals)
+        if EIMS_TAX_CODE_FIELDS & set(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
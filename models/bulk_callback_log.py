@@ -1,10 +1,54 @@
-from odoo import models, fields
+import json
+
+from odoo import models, fields, api
 
 class EimsBulkCallbackLog(models.Model):
     _name = "eims.bulk.callback.log"
     _description = "EIMS Bulk Callback Log"
     _order = "create_date desc"
 
-    conversation_id = fields.Char("Conversation ID")
+    # Inbox of bulk callback items: one row per conversation and document.
+    # A redelivered item hits the unique key and is acknowledged as is.
+    conversation_id = fields.Char("Conversation ID", required=True, default="")
+    document_number = fields.Char("Document Number", index=True)
+    invoice_id = fields.Many2one("account.move", string="Invoice", ondelete="set null", index="btree_not_null")
+    irn = fields.Char("IRN")
+    state = fields.Selection([
+        ("received", "Received"),
+        ("processed", "Processed"),
+        ("unmatched", "Unmatched"),
+    ], string="Status", default="received", required=True)
     payload = fields.Json("Payload")
     create_date = fields.Datetime("Received At", default=lambda self: fields.Datetime.now())
+
+    _sql_constraints = [
+        ('conversation_document_uniq', 'unique(conversation_id, document_number)',
+         'A callback item is only recorded once per conversation.'),
+    ]
+
+    @api.model
+    def _claim_items(self, conversation_id, items):
+        """
+        Record callback `items` ({document_number: item_json}) in the inbox
+        and return {document_number: log id} for the ones to process: new
+        items, and items left unmatched by an earlier delivery. Items
+        already processed are left out, without touching their row.
+        """
+        if not items:
+            return {}
+        # jsonb_each_text keeps the statement to one round trip for the chunk
+        self.env.cr.execute("""
+            INSERT INTO eims_bulk_callback_log (conversation_id, document_number, payload, state,
+                                                create_uid, create_date, write_uid, write_date)
+            SELECT %s, item.key, item.value::jsonb, 'received',
+                   %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC'
+              FROM jsonb_each_text(%s::jsonb) AS item
+            ON CONFLICT (conversation_id, document_number) DO UPDATE
+               SET payload = EXCLUDED.payload, state = 'received',
+                   write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+             WHERE eims_bulk_callback_log.state = 'unmatched'
+            RETURNING document_number, id
+        """, [conversation_id, self.env.uid, self.env.uid, json.dumps(items)])
+        claimed = dict(self.env.cr.fetchall())
+        self.invalidate_model(["payload", "state"])
+        return claimed
@@ -1,37 +1,93 @@
-import json
+import logging
+import os
+import threading
 import requests
 from datetime import datetime, timedelta
 from odoo import api, models
 from odoo.exceptions import UserError
-from ..services.crypto_utils import sign_eims_request
+from ..services.eims_request import build_eims_request
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 
-# Token cache (same as before)
-_TOKEN_CACHE = {
-    "access_token": None,
-    "expiry": None,
-    "encryption_key": None
-}
+_logger = logging.getLogger(__name__)
+
+TOKEN_LIFETIME_MINUTES = 55
+
+# Per-process copy of the shared token, keyed by (dbname, client key).
+# The authoritative copy lives in the eims.auth.token table.
+_TOKEN_CACHE = {}
+
+
+def _remember_token(cache_key, token, encryption_key, expiry):
+    _TOKEN_CACHE[cache_key] = {
+        "access_token": token,
+        "expiry": expiry,
+        "encryption_key": encryption_key,
+    }
+    return token, encryption_key
+
+
+# Long-lived keep-alive session per worker process. It is rebuilt when the
+# pool size changes and dropped in forked children, which must never reuse
+# the parent's sockets.
+_HTTP_SESSION = {"session": None, "pid": None, "pool_size": None}
+_HTTP_SESSION_LOCK = threading.Lock()
+
+
+def _build_http_session(pool_size):
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST", "GET"]
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry_strategy,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _reset_http_session_after_fork():
+    global _HTTP_SESSION_LOCK
+    _HTTP_SESSION_LOCK = threading.Lock()
+    _HTTP_SESSION.update({"session": None, "pid": None, "pool_size": None})
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_http_session_after_fork)
 
 
 class EimsAuth(models.AbstractModel):
     _name = "eims.auth"
     _description = "EIMS Authentication Handler"
 
+    @api.model
+    def _get_http_pool_size(self):
+        """Number of keep-alive connections kept per host (eims.http_pool_size)."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            return max(1, int(ICP.get_param("eims.http_pool_size", 10)))
+        except (TypeError, ValueError):
+            return 10
+
     @api.model
     def get_eims_http_session(self):
-        """Returns a requests Session configured with EIMS retry logic."""
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=2,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["POST", "GET"]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session = requests.Session()
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
+        """
+        Returns the worker's shared requests Session configured with EIMS
+        retry logic. Connections are kept alive and reused across calls.
+        """
+        pool_size = self._get_http_pool_size()
+        pid = os.getpid()
+        with _HTTP_SESSION_LOCK:
+            session = _HTTP_SESSION["session"]
+            if session is None or _HTTP_SESSION["pid"] != pid or _HTTP_SESSION["pool_size"] != pool_size:
+                session = _build_http_session(pool_size)
+                _HTTP_SESSION.update({"session": session, "pid": pid, "pool_size": pool_size})
         return session
 
     @api.model
@@ -63,26 +119,17 @@ class EimsAuth(models.AbstractModel):
         return client_id, client_secret, api_key, tin, login_url
 
     @api.model
-    def get_eims_token(self):
-        """
-        Returns a valid EIMS token.
-        Loads credentials from Odoo System Parameters (secure),
-        caches token for 55 minutes.
-        """
-        global _TOKEN_CACHE
-
-        # Return cached token if still valid
-        if _TOKEN_CACHE["access_token"] and _TOKEN_CACHE["expiry"]:
-            if datetime.utcnow() < _TOKEN_CACHE["expiry"]:
-                return (
-                    _TOKEN_CACHE["access_token"],
-                    _TOKEN_CACHE["encryption_key"]
-                )
-
-        # Load secure credentials
-        client_id, client_secret, api_key, tin, login_url = self.get_eims_credentials()
+    def _get_token_refresh_margin(self):
+        """Seconds before expiry at which a cached token is refreshed."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            return timedelta(seconds=int(ICP.get_param("eims.token_refresh_margin", 300)))
+        except (TypeError, ValueError):
+            return timedelta(seconds=300)
 
-        # Prepare payload
+    @api.model
+    def _request_eims_token(self, client_id, client_secret, api_key, tin, login_url):
+        """Call the EIMS login API and return (token, encryption_key, expiry)."""
         payload = {
             "clientId": client_id,
             "clientSecret": client_secret,
@@ -92,21 +139,96 @@ class EimsAuth(models.AbstractModel):
 
         headers = {"Content-Type": "application/json"}
 
-        # Call EIMS login API
-        signed_payload = sign_eims_request(payload)
-        response = requests.post(login_url, json=signed_payload, headers=headers, timeout=30)
+        request_body = build_eims_request(payload)
+        http = self.get_eims_http_session()
+        response = http.post(login_url, data=request_body, headers=headers, timeout=30)
         response.raise_for_status()
         data = response.json()
 
         token = data["data"]["accessToken"]
         encryption_key = data["data"].get("encryptionKey")
-        expiry = datetime.utcnow() + timedelta(minutes=55)
+        expiry = datetime.utcnow() + timedelta(minutes=TOKEN_LIFETIME_MINUTES)
+        return token, encryption_key, expiry
 
-        # Cache token
-        _TOKEN_CACHE.update({
-            "access_token": token,
-            "expiry": expiry,
-            "encryption_key": encryption_key
-        })
+    @api.model
+    def _read_shared_token(self, cr, key):
+        """(access token, encryption key, expiry) of the shared row `key`."""
+        cr.execute(
+            "SELECT access_token, encryption_key, expiry FROM eims_auth_token WHERE name = %s",
+            (key,),
+        )
+        return cr.fetchone()
 
-        return token, encryption_key
+    @api.model
+    def get_eims_token(self):
+        """
+        Returns a valid EIMS token.
+        Loads credentials from Odoo System Parameters (secure),
+        caches token for 55 minutes.
+
+        The token is shared by all workers through the eims.auth.token table.
+        Only the worker holding the advisory lock logs in; the others reuse the
+        current token while it is still valid, or wait for the new one.
+        Refresh starts `eims.token_refresh_margin` seconds before expiry.
+        """
+        client_id, client_secret, api_key, tin, login_url = self.get_eims_credentials()
+        key = f"{client_id}@{login_url}"
+        cache_key = (self.env.cr.dbname, key)
+        margin = self._get_token_refresh_margin()
+        now = datetime.utcnow()
+
+        # 1. Per-process copy, no database round trip
+        cached = _TOKEN_CACHE.get(cache_key)
+        if cached and now < cached["expiry"] - margin:
+            return cached["access_token"], cached["encryption_key"]
+
+        # 2. Shared copy, read and refreshed in an independent transaction so
+        #    the new token is visible to other workers as soon as it exists.
+        #    Refreshes are serialized by a session advisory lock rather than a
+        #    row lock: at REPEATABLE READ, locking a row another worker updated
+        #    after our snapshot fails with a serialization error, whereas after
+        #    the advisory lock a new transaction simply reads the new token.
+        with self.env.registry.cursor() as cr:
+            cr.execute(
+                "INSERT INTO eims_auth_token (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+                (key,),
+            )
+            cr.commit()
+
+            token, encryption_key, expiry = self._read_shared_token(cr, key)
+            if token and expiry and now < expiry - margin:
+                return _remember_token(cache_key, token, encryption_key, expiry)
+            cr.rollback()
+
+            # Someone else may already be refreshing: reuse the token while
+            # it has not actually expired, otherwise wait for the lock.
+            cr.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (key,))
+            if not cr.fetchone()[0]:
+                if token and expiry and now < expiry:
+                    return _remember_token(cache_key, token, encryption_key, expiry)
+                cr.execute("SELECT pg_advisory_lock(hashtext(%s))", (key,))
+            try:
+                # Re-check in a new snapshot: the previous holder may have refreshed it
+                cr.rollback()
+                token, encryption_key, expiry = self._read_shared_token(cr, key)
+                if token and expiry and datetime.utcnow() < expiry - margin:
+                    return _remember_token(cache_key, token, encryption_key, expiry)
+
+                _logger.info("[EIMS] Refreshing access token for %s", key)
+                token, encryption_key, expiry = self._request_eims_token(
+                    client_id, client_secret, api_key, tin, login_url
+                )
+                cr.execute(
+                    "UPDATE eims_auth_token SET access_token = %s, encryption_key = %s, expiry = %s, "
+                    "write_date = (now() at time zone 'UTC') WHERE name = %s",
+                    (token, encryption_key, expiry, key),
+                )
+                cr.commit()
+            finally:
+                # The lock outlives transactions: always release it before
+                # the connection goes back to the pool.
+                cr.rollback()
+                cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", (key,))
+                cr.commit()
+
+        return _remember_token(cache_key, token, encryption_key, expiry)
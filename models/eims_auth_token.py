@@ -0,0 +1,17 @@
+from odoo import models, fields
+
+
+class EimsAuthToken(models.Model):
+    _name = "eims.auth.token"
+    _description = "EIMS Shared Access Token"
+
+    # One row per EIMS client; rows are read and locked with raw SQL by
+    # eims.auth.get_eims_token so every worker shares the same token.
+    name = fields.Char(string="Client Key", required=True, index=True)
+    access_token = fields.Char(string="Access Token")
+    encryption_key = fields.Char(string="Encryption Key")
+    expiry = fields.Datetime(string="Expiry (UTC)")
+
+    _sql_constraints = [
+        ('name_uniq', 'unique(name)', 'Only one shared EIMS token per client is allowed.'),
+    ]
@@ -1,109 +1,232 @@
+import logging
+import time
+from ast import literal_eval
+
 from odoo import models, fields, api
 from odoo.exceptions import UserError
 
+_logger = logging.getLogger(__name__)
+
+REASON_CODES = [
+    ('1', '1 - Duplication'),
+    ('2', '2 - Data Entry Mistake'),
+    ('3', '3 - Order Cancellation'),
+    ('4', '4 - Other Reason'),
+]
+LINE_PAGE_SIZE = 80
+# Selections up to this size are cancelled right away, larger ones by the cron
+SYNC_CANCEL_LIMIT = 200
+CANCEL_BATCH_SIZE = 500
+CANCEL_TIME_BUDGET = 240  # seconds
+
 
 class EIMSBulkCancelWizard(models.TransientModel):
     _name = 'eims.bulk.cancel.wizard'
     _description = 'EIMS Bulk Cancel Wizard'
+    # Keep wizards alive while the cron works through a large selection
+    _transient_max_hours = 24.0
+
+    # The selection is kept as a domain and only filtered in SQL; lines are
+    # loaded page by page and only carry reasons that differ per invoice.
+    invoice_domain = fields.Char(string='Invoice Domain', readonly=True)
+    invoice_count = fields.Integer(string='Invoices to Cancel', readonly=True)
+    default_reason_code = fields.Selection(REASON_CODES, string='Reason', required=True, default='1')
 
-    # Store invoice IDs as text (workaround for TransientModel issues)
-    selected_invoice_ids = fields.Char(string='Selected Invoice IDs')
-    
     line_ids = fields.One2many(
         'eims.bulk.cancel.wizard.line',
         'wizard_id',
         string='Invoice Lines'
     )
+    has_more_lines = fields.Boolean(compute='_compute_has_more_lines')
+
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Stopped'),
+    ], default='draft', required=True)
+    # The cron runs the wizard as its creator, within the companies active at confirmation
+    company_ids = fields.Many2many('res.company', string='Allowed Companies', readonly=True)
+    last_error = fields.Text(string='Error', readonly=True)
+    last_processed_id = fields.Integer(default=0)
+    processed_count = fields.Integer(string='Processed', readonly=True)
+    cancelled_count = fields.Integer(string='Cancelled', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    progress = fields.Float(compute='_compute_progress')
+
+    @api.model
+    def _eligible_domain(self):
+        return [('eims_irn', '!=', False), ('eims_status', '=', 'verified')]
 
     @api.model
     def default_get(self, fields_list):
-        """Populate wizard with selected invoices BEFORE form opens"""
+        """Count the selection in SQL and load the first page of lines"""
         res = super().default_get(fields_list)
-        
-        # Get active invoice IDs from context
-        active_ids = self.env.context.get('active_ids', [])
-        
-        if not active_ids:
+
+        # Get active invoice IDs (or the "select all" domain) from context
+        active_ids = self.env.context.get('active_ids')
+        if active_ids:
+            domain = [('id', 'in', active_ids)]
+        elif self.env.context.get('active_domain') is not None:
+            domain = list(self.env.context['active_domain'])
+        else:
             raise UserError("No invoices selected for cancellation.")
-        
+
         # Get invoices with IRN that are verified
-        invoices = self.env['account.move'].browse(active_ids).filtered(
-            lambda inv: inv.eims_irn and inv.eims_status == 'verified'
-        )
-        
-        if not invoices:
+        domain = domain + self._eligible_domain()
+        count = self.env['account.move'].search_count(domain)
+        if not count:
             raise UserError("No verified invoices with IRN found in selection.")
-        
-        # Store invoice IDs as comma-separated string (guaranteed to persist)
-        res['selected_invoice_ids'] = ','.join(map(str, invoices.ids))
-        
-        # Build wizard lines data
-        lines_data = []
-        for invoice in invoices:
-            lines_data.append((0, 0, {
-                'invoice_id': invoice.id,
-                'reason_code': '1',
-            }))
-        
-        res['line_ids'] = lines_data
+
+        res['invoice_domain'] = repr(domain)
+        res['invoice_count'] = count
+        res['line_ids'] = [
+            (0, 0, {'invoice_id': invoice.id, 'reason_code': res.get('default_reason_code', '1')})
+            for invoice in self.env['account.move'].search_fetch(domain, ['id'], order='id', limit=LINE_PAGE_SIZE)
+        ]
         return res
 
-    def action_confirm_cancellation(self):
-        """Process bulk cancellation with selected reasons"""
+    @api.depends('line_ids', 'invoice_count')
+    def _compute_has_more_lines(self):
+        for wizard in self:
+            wizard.has_more_lines = len(wizard.line_ids) < wizard.invoice_count
+
+    @api.depends('processed_count', 'invoice_count')
+    def _compute_progress(self):
+        for wizard in self:
+            wizard.progress = 100.0 * wizard.processed_count / wizard.invoice_count if wizard.invoice_count else 0.0
+
+    @api.onchange('default_reason_code')
+    def _onchange_default_reason_code(self):
+        for line in self.line_ids:
+            line.reason_code = self.default_reason_code
+
+    def _get_invoice_domain(self):
+        return literal_eval(self.invoice_domain or '[]')
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+            'name': 'Bulk Cancel EIMS Invoices',
+        }
+
+    def action_load_more_lines(self):
+        """Append the next page of invoices to the lines"""
+        self.ensure_one()
+        last_loaded_id = max(self.line_ids.invoice_id.ids, default=0)
+        invoices = self.env['account.move'].search_fetch(
+            self._get_invoice_domain() + [('id', '>', last_loaded_id)], ['id'], order='id', limit=LINE_PAGE_SIZE,
+        )
+        self.env['eims.bulk.cancel.wizard.line'].create([{
+            'wizard_id': self.id,
+            'invoice_id': invoice.id,
+            'reason_code': self.default_reason_code,
+        } for invoice in invoices])
+        return self._reopen()
+
+    def action_refresh(self):
+        return self._reopen()
+
+    # -------------------------------------------------------------------------
+    # Processing
+    # -------------------------------------------------------------------------
+    def _process_next_batch(self, limit=CANCEL_BATCH_SIZE):
+        """
+        Cancel the next `limit` invoices after `last_processed_id`, one
+        chunked bulk cancel per reason code. Returns False once done.
+        """
         self.ensure_one()
-        
-        # Get invoices from stored IDs (fallback if line_ids don't have invoice_id)
-        invoice_ids = []
-        if self.selected_invoice_ids:
-            invoice_ids = [int(x) for x in self.selected_invoice_ids.split(',') if x]
-        
-        if not invoice_ids:
-            raise UserError("No invoices found for cancellation.")
-        
-        invoices = self.env['account.move'].browse(invoice_ids)
-        
+        invoices = self.env['account.move'].search(
+            self._get_invoice_domain() + [('id', '>', self.last_processed_id)], order='id', limit=limit,
+        )
+        if not invoices:
+            self.state = 'done'
+            return False
+
         # Build reason code mapping from lines (if available)
-        reason_map = {}
-        for line in self.line_ids:
-            if line.invoice_id:
-                reason_map[line.invoice_id.id] = line.reason_code
-        
-        cancelled_count = 0
-        error_count = 0
-        
-        # Process each invoice
+        reason_map = {line.invoice_id.id: line.reason_code for line in self.line_ids if line.invoice_id}
+
+        # Group by reason code: one chunked bulk cancel per reason
+        invoices_by_reason = {}
         for invoice in invoices:
-            try:
-                if not invoice.eims_irn:
-                    invoice.message_post(body="❌ No IRN found. Skipped cancellation.")
+            reason_code = reason_map.get(invoice.id, self.default_reason_code)
+            invoices_by_reason.setdefault(reason_code, self.env['account.move'])
+            invoices_by_reason[reason_code] |= invoice
+
+        cancelled_count = error_count = 0
+        for reason_code, reason_invoices in invoices_by_reason.items():
+            outcomes = reason_invoices._eims_bulk_cancel(reason_code=reason_code, remark="")
+            for ok, msg in outcomes.values():
+                if ok:
+                    cancelled_count += 1
+                else:
                     error_count += 1
-                    continue
-                
-                # Get reason code from mapping or default to '1'
-                reason_code = reason_map.get(invoice.id, '1')
-                
-                # Call cancel method with reason code
-                invoice.action_cancel_eims(reason_code=reason_code)
-                cancelled_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                invoice.message_post(
-                    body=f"⚠️ <b>Bulk Cancel Error:</b> {str(e)}"
-                )
-        
+
+        self.write({
+            'last_processed_id': invoices[-1].id,
+            'processed_count': self.processed_count + len(invoices),
+            'cancelled_count': self.cancelled_count + cancelled_count,
+            'error_count': self.error_count + error_count,
+        })
+        return True
+
+    def action_confirm_cancellation(self):
+        """Process bulk cancellation with selected reasons"""
+        self.ensure_one()
+
+        if self.invoice_count > SYNC_CANCEL_LIMIT:
+            self.write({'state': 'running', 'company_ids': [(6, 0, self.env.companies.ids)]})
+            cron = self.env.ref('eims_test_connector_12.ir_cron_eims_bulk_cancel', raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+            return self._reopen()
+
+        self.state = 'running'
+        while self._process_next_batch():
+            pass
+
         # Return notification
-        message = f'✅ Bulk Cancellation Complete: {cancelled_count} cancelled'
-        if error_count > 0:
-            message += f', {error_count} errors (check chatter)'
-        
+        message = f'✅ Bulk Cancellation Complete: {self.cancelled_count} cancelled'
+        if self.error_count > 0:
+            message += f', {self.error_count} errors (check chatter)'
+
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': 'Bulk Cancellation',
                 'message': message,
-                'type': 'success' if error_count == 0 else 'warning',
+                'type': 'success' if self.error_count == 0 else 'warning',
                 'sticky': False,
             }
         }
+
+    @api.model
+    def _cron_process_bulk_cancel(self):
+        """Work through running wizards batch by batch, committing each batch"""
+        deadline = time.monotonic() + CANCEL_TIME_BUDGET
+        for wizard in self.search([('state', '=', 'running')], order='id'):
+            # Record rules and company restrictions of the requesting user apply
+            wizard = wizard.with_user(wizard.create_uid).with_context(
+                allowed_company_ids=(wizard.company_ids & wizard.create_uid.company_ids).ids
+                or wizard.create_uid.company_id.ids,
+            )
+            while time.monotonic() < deadline:
+                try:
+                    more = wizard._process_next_batch()
+                except Exception as e:
+                    self.env.cr.rollback()
+                    _logger.error("[EIMS] Bulk cancel wizard %s stopped: %s", wizard.id, e)
+                    wizard.write({'state': 'failed', 'last_error': str(e)})
+                    more = False
+                self.env.cr.commit()
+                if not more:
+                    break
+            if time.monotonic() >= deadline:
+                # Time budget spent with work left: run again right away
+                self.env.ref('eims_test_connector_12.ir_cron_eims_bulk_cancel')._trigger()
+                return
@@ -1,5 +1,7 @@
 from odoo import models, fields
 
+from .eims_bulk_cancel_wizard import REASON_CODES
+
 
 class EIMSBulkCancelWizardLine(models.TransientModel):
     _name = 'eims.bulk.cancel.wizard.line'
@@ -48,12 +50,7 @@ class EIMSBulkCancelWizardLine(models.TransientModel):
     )
     
     reason_code = fields.Selection(
-        [
-            ('1', '1 - Duplication'),
-            ('2', '2 - Data Entry Mistake'),
-            ('3', '3 - Order Cancellation'),
-            ('4', '4 - Other Reason'),
-        ],
+        REASON_CODES,
         string='Reason',
         required=True,
         default='1'
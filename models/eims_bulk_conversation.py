@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+
+from odoo import models, fields, api
+from odoo.addons.eims_test_connector_12.services.crypto_utils import sign_many
+from .account_move import _map_concurrently
+
+_logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 100
+BULK_CONCURRENCY = 4
+BULK_RATE_LIMIT = 2.0  # requests per second, 0 = no limit
+
+
+class _RateLimiter:
+    """Space calls at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class EimsBulkConversation(models.Model):
+    _name = "eims.bulk.conversation"
+    _description = "EIMS Bulk Registration Chunk"
+    _order = "id desc"
+
+    # One record per chunk of a bulk send. MoR answers each chunk with a
+    # conversation ID and reports the registered invoices on the bulk
+    # callback, where the mappings of the chunk are resolved.
+    name = fields.Char(string="Conversation ID", index=True, copy=False)
+    company_id = fields.Many2one("res.company", string="Company", required=True,
+                                 default=lambda self: self.env.company)
+    state = fields.Selection([
+        ("queued", "Queued"),
+        ("sent", "Awaiting Callback"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ], string="Status", default="queued", required=True, index=True)
+    invoice_ids = fields.Many2many("account.move", string="Invoices")
+    invoice_count = fields.Integer(string="Invoices", compute="_compute_invoice_count")
+    mapping_ids = fields.One2many("eims.bulk.mapping", "conversation_id", string="Pending Mappings")
+    attempts = fields.Integer(string="Attempts", default=0)
+    last_error = fields.Text(string="Last Error")
+    date_sent = fields.Datetime(string="Sent On")
+
+    @api.depends("invoice_ids")
+    def _compute_invoice_count(self):
+        for conversation in self:
+            conversation.invoice_count = len(conversation.invoice_ids)
+
+    def _get_bulk_param(self, key, default, cast=int):
+        value = self.env["ir.config_parameter"].sudo().get_param(key)
+        try:
+            return cast(value) if value else default
+        except ValueError:
+            return default
+
+    # -------------------------------------------------------------------------
+    # Dispatch
+    # -------------------------------------------------------------------------
+    @api.model
+    def _create_chunks(self, invoices):
+        """Split `invoices` per company into chunks of eims.bulk_chunk_size, one conversation each."""
+        chunk_size = max(self._get_bulk_param("eims.bulk_chunk_size", BULK_CHUNK_SIZE), 1)
+        values = []
+        for company in invoices.company_id:
+            company_invoices = invoices.filtered(lambda inv: inv.company_id == company)
+            values += [
+                {"company_id": company.id, "invoice_ids": [(6, 0, company_invoices[start:start + chunk_size].ids)]}
+                for start in range(0, len(company_invoices), chunk_size)
+            ]
+        return self.create(values)
+
+    def _dispatch(self):
+        """
+        Send the chunks company by company: payloads and the TIN and
+        SystemNumber headers are those of the chunk's company, whatever
+        the company of the session retrying it.
+        """
+        for company in self.company_id:
+            self.filtered(lambda c: c.company_id == company).with_company(company)._dispatch_company()
+
+    def _dispatch_company(self):
+        """
+        Send the chunks in waves of eims.bulk_concurrency: each wave is
+        prepared, signed and committed on this thread, posted from worker
+        threads (network only, spaced by eims.bulk_rate_limit), then each
+        answer is applied and committed on its own. The callback mappings
+        are thus committed before MoR can call back, and a failing chunk or
+        an interrupted run never drops mappings of chunks already posted.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        concurrency = max(self._get_bulk_param("eims.bulk_concurrency", BULK_CONCURRENCY), 1)
+        concurrency = min(concurrency, self.env["eims.auth"]._get_http_pool_size())
+        limiter = _RateLimiter(self._get_bulk_param("eims.bulk_rate_limit", BULK_RATE_LIMIT, float))
+
+        callback_url = ICP.get_param("eims.callback.url") or "https://91.99.115.196/eims/bulk-callback"
+        # Deployments without a bulk endpoint keep posting where they used to
+        bulk_url = ICP.get_param("eims.api_bulk.register_url") or callback_url
+
+        http = self.env["eims.auth"].get_eims_http_session()
+        token, encryption_key = self.env["eims.auth"].get_eims_token()
+        company = self.company_id
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "TIN": company.eims_tin,
+            "SystemNumber": company.eims_system_number,
+            "CallbackURL": callback_url,
+            "Content-Type": "application/json",
+        }
+
+        def post(body):
+            limiter.wait()
+            response = http.post(bulk_url, headers=headers, data=body, timeout=(5, 60))
+            response.raise_for_status()
+            return response.json()
+
+        for start in range(0, len(self), concurrency):
+            wave = self.browse()
+            payloads = []
+            for conversation in self[start:start + concurrency]:
+                payload_list = conversation._prepare_chunk()
+                if not payload_list:
+                    # Everything in it got an IRN meanwhile (e.g. sent one by one)
+                    conversation.write({"state": "done", "last_error": False})
+                    continue
+                wave |= conversation
+                payloads.append(payload_list)
+            if not wave:
+                self.env.cr.commit()
+                continue
+            try:
+                bodies = sign_many(payloads)
+            except Exception as e:
+                results = [(None, e)] * len(wave)
+            else:
+                wave._mark_sent()
+                self.env.cr.commit()
+                results = _map_concurrently(post, bodies, concurrency)
+            for conversation, (res_json, error) in zip(wave, results):
+                conversation._apply_chunk_result(res_json, error)
+                self.env.cr.commit()
+
+    def _prepare_chunk(self):
+        """Build the payload list of the chunk and record its callback mappings."""
+        self.ensure_one()
+        invoices = self.invoice_ids.filtered(lambda inv: inv.state == "posted" and not inv.eims_irn)
+        self.mapping_ids.unlink()
+        payload_list = list(invoices.prepare_eims_payloads())
+        self.env["eims.bulk.mapping"].sudo().create([
+            {
+                "document_number": str(payload_item["DocumentDetails"]["DocumentNumber"]),
+                "invoice_id": invoice.id,
+                "conversation_id": self.id,
+            }
+            for invoice, payload_item in zip(invoices, payload_list)
+        ])
+        return payload_list
+
+    def _mark_sent(self):
+        """Record the upcoming post, committed with the mappings before it goes out."""
+        now = fields.Datetime.now()
+        for conversation in self:
+            conversation.write({
+                "state": "sent",
+                "attempts": conversation.attempts + 1,
+                "date_sent": now,
+                "last_error": False,
+            })
+
+    def _apply_chunk_result(self, res_json, error):
+        self.ensure_one()
+        if error is not None:
+            self.mapping_ids.unlink()
+            values = {"state": "failed", "last_error": str(error)}
+            if self.state != "sent":
+                # Never posted (signing failed): count the attempt here
+                values.update(attempts=self.attempts + 1, date_sent=fields.Datetime.now())
+            self.write(values)
+            for invoice in self.invoice_ids:
+                invoice.message_post(body=f"❌ Bulk EIMS Error: {error}")
+            _logger.warning("[EIMS-BULK] Chunk %s failed: %s", self.id, error)
+            return
+        conversation_id = res_json.get("conversationId", "pending")
+        self.name = conversation_id
+        for invoice in self.invoice_ids:
+            invoice.message_post(
+                body=f"📨 Bulk EIMS sent. Awaiting callback.\nConversation ID: {conversation_id}"
+            )
+        # Fast callbacks may already have resolved every mapping of the chunk
+        self.invalidate_recordset(["mapping_ids"])
+        self._update_callback_state()
+        _logger.info("[EIMS-BULK] Chunk %s sent as conversation %s", self.id, conversation_id)
+
+    def _update_callback_state(self):
+        """Mark the chunks whose mappings were all resolved by callbacks as done."""
+        self.filtered(lambda c: c.state == "sent" and not c.mapping_ids).write({"state": "done"})
+
+    def action_retry(self):
+        failed = self.filtered(lambda conversation: conversation.state == "failed")
+        if failed:
+            failed._dispatch()
@@ -1,4 +1,12 @@
-from odoo import models, fields
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+BULK_MAPPING_TTL_DAYS = 7
+
 
 class EimsBulkMapping(models.Model):
     _name = 'eims.bulk.mapping'
@@ -6,3 +14,60 @@ class EimsBulkMapping(models.Model):
 
     invoice_id = fields.Many2one('account.move', string='Invoice', required=True, ondelete='cascade')
     document_number = fields.Char(string='Document Number', required=True)
+    conversation_id = fields.Many2one('eims.bulk.conversation', string='Conversation', ondelete='cascade',
+                                      index='btree_not_null')
+
+    # The unique key also serves lookups by document number (leading column)
+    _sql_constraints = [
+        ('document_conversation_uniq', 'unique(document_number, conversation_id)',
+         'A document number is only mapped once per bulk conversation.'),
+    ]
+
+    @api.model
+    def resolve(self, doc_numbers, conversation=None):
+        """
+        Return {document_number: mapping} for `doc_numbers` in one query,
+        with the invoice and conversation ids loaded. With `conversation`
+        (the MoR conversation ID of the callback) only the mappings of that
+        conversation are considered, then those of chunks posted but whose
+        answer, carrying the conversation ID, is not applied yet; without
+        it, when a number was mapped more than once, the most recent
+        mapping wins.
+        """
+        if not doc_numbers:
+            return {}
+        domain = [('document_number', 'in', list(doc_numbers))]
+        if conversation:
+            domain.append(('conversation_id.name', 'in', [conversation, False]))
+        mappings = self.search_fetch(
+            domain,
+            ['document_number', 'invoice_id', 'conversation_id'],
+            order='id desc',
+        )
+        mapping_by_doc = {}
+        for mapping in mappings:
+            current = mapping_by_doc.get(mapping.document_number)
+            if current is None or (current.conversation_id.name != conversation
+                                   and mapping.conversation_id.name == conversation):
+                mapping_by_doc[mapping.document_number] = mapping
+        return mapping_by_doc
+
+    @api.autovacuum
+    def _gc_expired_mappings(self):
+        """Drop mappings whose callback never came within eims.bulk_mapping_ttl_days."""
+        value = self.env['ir.config_parameter'].sudo().get_param('eims.bulk_mapping_ttl_days')
+        try:
+            days = int(value) if value else BULK_MAPPING_TTL_DAYS
+        except ValueError:
+            days = BULK_MAPPING_TTL_DAYS
+        if days <= 0:
+            return
+        expired = self.search([('create_date', '<', fields.Datetime.now() - timedelta(days=days))])
+        if not expired:
+            return
+        conversations = expired.conversation_id
+        expired.unlink()
+        conversations.filtered(lambda c: c.state == 'sent').write({
+            'last_error': f"Callback not received within {days} day(s) for some invoices.",
+        })
+        _logger.warning("[EIMS-BULK] %s bulk mapping(s) expired without callback", len(expired))
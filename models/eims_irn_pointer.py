@@ -0,0 +1,72 @@
+from odoo import models, fields, api
+
+
+class EimsIrnPointer(models.Model):
+    _name = "eims.irn.pointer"
+    _description = "EIMS Last Registered IRN"
+
+    # One row per company and source system, swapped with raw SQL under a
+    # row lock by _swap_last_irn so concurrent registrations chain properly.
+    company_id = fields.Many2one("res.company", string="Company", required=True, ondelete="cascade")
+    system_number = fields.Char(string="System Number")
+    last_irn = fields.Char(string="Last IRN")
+    last_move_id = fields.Many2one("account.move", string="Last Invoice", ondelete="set null")
+    previous_irn = fields.Char(string="IRN Before Last")
+
+    _sql_constraints = [
+        ('company_system_uniq', 'unique(company_id, system_number)',
+         'Only one IRN pointer per company and system is allowed.'),
+    ]
+
+    @api.model
+    def _swap_last_irn(self, move, irn):
+        """
+        Record `irn` as the last IRN registered for the company/system of
+        `move` and return the IRN registered before it ("" if none).
+        """
+        company = move.company_id
+        system_number = company.eims_system_number or ""
+        cr = self.env.cr
+
+        cr.execute("""
+            INSERT INTO eims_irn_pointer (company_id, system_number, create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, now() AT TIME ZONE 'UTC', %s, now() AT TIME ZONE 'UTC')
+            ON CONFLICT (company_id, system_number) DO NOTHING
+            RETURNING id
+        """, [company.id, system_number, self.env.uid, self.env.uid])
+        created = cr.fetchone()
+
+        # The row lock serializes registrations of one company/system until commit
+        cr.execute("""
+            SELECT id, last_irn, last_move_id, previous_irn
+              FROM eims_irn_pointer
+             WHERE company_id = %s AND system_number = %s
+               FOR UPDATE
+        """, [company.id, system_number])
+        pointer_id, last_irn, last_move_id, previous_irn = cr.fetchone()
+
+        if created:
+            # First registration since the pointer exists: seed it from the logs
+            last_irn, last_move_id = self._seed_last_irn(move), None
+
+        # A re-registered invoice chains to the IRN before its own old one
+        previous = previous_irn if last_move_id == move.id else last_irn
+
+        cr.execute("""
+            UPDATE eims_irn_pointer
+               SET last_irn = %s, last_move_id = %s, previous_irn = %s,
+                   write_uid = %s, write_date = now() AT TIME ZONE 'UTC'
+             WHERE id = %s
+        """, [irn, move.id, previous, self.env.uid, pointer_id])
+        self.invalidate_model(["last_irn", "last_move_id", "previous_irn"])
+        return previous or ""
+
+    @api.model
+    def _seed_last_irn(self, move):
+        previous_log = self.env['eims.registered.invoice'].sudo().search([
+            ('move_id', '!=', move.id),
+            ('move_id.company_id', '=', move.company_id.id),
+            ('eims_irn', '!=', False),
+            ('status', '=', 'success'),
+        ], order='create_date desc', limit=1)
+        return previous_log.eims_irn or ""
@@ -2,6 +2,9 @@ import json
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from odoo.addons.eims_test_connector_12.services.eims_body_mapper import (
+    VERIFIED_LOG_FIELDS, copy_values, write_changed,
+)
 import qrcode
 import base64
 from io import BytesIO
@@ -174,74 +177,25 @@ class EimsRegisteredInvoice(models.Model):
 
             # Trigger invoice verification
             record.move_id.action_verify_invoice()
+            record._sync_from_verified_move()
 
+    def _sync_from_verified_move(self):
+        """Copy the verified invoice data onto the log."""
+        for record in self:
             # Map status for the log
             eims_status_value = 'failed'
             if record.move_id.eims_status and str(record.move_id.eims_status).lower() in ['verified', 'success', 'a']:
                 eims_status_value = 'success'
 
             # Update the log record with values from the verified invoice
-            record.write({
+            values = copy_values(record.move_id, record, VERIFIED_LOG_FIELDS)
+            values.update({
                 'eims_verified': True,
                 'status': eims_status_value,
-                'eims_status': record.move_id.eims_status or '',
-                'eims_document_number': record.move_id.eims_document_number or '',
-                'eims_document_date': record.move_id.eims_document_date or False,
-                'eims_verified_data': record.move_id.eims_verified_data or {},
-                # 'eims_buyer_details': record.move_id.eims_buyer_details or {},
-
-                # 'eims_seller_details': record.move_id.eims_seller_details or {},
-                # 'eims_value_details': record.move_id.eims_value_details or {},
-                # 'eims_payment_details': record.move_id.eims_payment_details or {},
-                'eims_qr_code': record.move_id.eims_qr_code or '',
-                'eims_signed_invoice': record.move_id.eims_signed_invoice or '',
                 'eims_response': record.move_id.eims_verified_data and json.dumps(record.move_id.eims_verified_data,
                                                                                   indent=2) or '',
-                'eims_total_value': record.move_id.eims_total_value or 0,
-                'eims_tax_value': record.move_id.eims_tax_value or 0,
-                'eims_invoice_currency': record.move_id.eims_invoice_currency or '',
-                # 'eims_buyers_id_type': record.move_id.eims_buyers_id_type or '',
-                'eims_buyers_id_number': record.move_id.eims_buyers_id_number or '',
-                'eims_buyers_legal_name': record.move_id.eims_buyers_legal_name or '',
-                'eims_buyers_email': record.move_id.eims_buyers_email or '',
-                'eims_buyers_phone': record.move_id.eims_buyers_phone or '',
-                'eims_buyers_tin': record.move_id.eims_buyers_tin or '',
-                'eims_buyers_city_code': record.move_id.eims_buyers_city_code or '',
-                'eims_buyers_region': record.move_id.eims_buyers_region or '',
-                'eims_buyers_wereda': record.move_id.eims_buyers_wereda or '',
-
-                # 'eims_seller_id_type': record.move_id.eims_seller_id_type or '',
-                # 'eims_seller_id_number': record.move_id.eims_seller_id_number or '',
-                'eims_seller_legal_name': record.move_id.eims_seller_legal_name or '',
-                'eims_seller_email': record.move_id.eims_seller_email or '',
-                'eims_seller_phone': record.move_id.eims_seller_phone or '',
-                'eims_seller_tin': record.move_id.eims_seller_tin or '',
-                'eims_seller_city_code': record.move_id.eims_seller_city_code or '',
-                'eims_seller_region': record.move_id.eims_seller_region or '',
-                'eims_seller_wereda': record.move_id.eims_seller_wereda or '',
-                'eims_seller_tax_center': record.move_id.eims_seller_tax_center or '',
-                'eims_seller_vat_number': record.move_id.eims_seller_vat_number or '',
-                'eims_seller_house_number': record.move_id.eims_seller_house_number or '',
-                'eims_seller_locality': record.move_id.eims_seller_locality or '',
-
-                'eims_payment_mode': record.move_id.eims_payment_mode or '',
-                'eims_payment_term': record.move_id.eims_payment_term or '',
-
-                'eims_source_system': record.move_id.eims_source_system or '',
-                'eims_cashier_name': record.move_id.eims_cashier_name or '',
-                'eims_system_number': record.move_id.eims_system_number or '',
-                'eims_invoice_counter': record.move_id.eims_invoice_counter or '',
-                'eims_sales_person_name': record.move_id.eims_sales_person_name or '',
-                'eims_document_type': record.move_id.eims_document_type or '',
-                'eims_document_reason': record.move_id.eims_document_reason or '',
-
-                'eims_transaction_type': record.move_id.eims_transaction_type or '',
-                'eims_reference_details': record.move_id.eims_reference_details or '',
-                'eims_previous_irn': record.move_id.eims_previous_irn or '',
-
-                # 'eims_response': record.move_id.eims_response or '',
-
             })
+            write_changed(record, values)
 
             # Post a message in the chatter
             record.message_post(body=_(
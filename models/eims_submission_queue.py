@@ -0,0 +1,192 @@
+import logging
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+QUEUE_BATCH_SIZE = 50
+QUEUE_TIME_BUDGET = 240  # seconds, stay well below the cron time limit
+QUEUE_STALE_MINUTES = 15
+
+
+class EimsSubmissionQueue(models.Model):
+    _name = "eims.submission.queue"
+    _description = "EIMS Submission Queue"
+    _order = "id desc"
+
+    move_id = fields.Many2one("account.move", string="Invoice", required=True, ondelete="cascade", index=True)
+    company_id = fields.Many2one(related="move_id.company_id", store=True)
+    job_type = fields.Selection([
+        ("register", "Register"),
+        ("verify", "Verify"),
+    ], string="Job", default="register", required=True, index=True)
+    note = fields.Html(string="Chatter Note", help="Posted on the invoice when the job runs.")
+    state = fields.Selection([
+        ("queued", "Queued"),
+        ("in_flight", "In Flight"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ], string="Status", default="queued", required=True, index=True)
+    attempts = fields.Integer(string="Attempts", default=0)
+    last_error = fields.Text(string="Last Error")
+    date_started = fields.Datetime(string="Started On")
+    date_done = fields.Datetime(string="Finished On")
+
+    # -------------------------------------------------------------------------
+    # Enqueue
+    # -------------------------------------------------------------------------
+    @api.model
+    def _enqueue(self, moves, job_type="register", notes=None):
+        """
+        Queue `moves` for `job_type` and wake the dispatcher up. `notes`
+        ({move_id: html}) are posted on the invoices when the jobs run.
+        """
+        notes = notes or {}
+        open_jobs = self.search([
+            ("move_id", "in", moves.ids),
+            ("job_type", "=", job_type),
+            ("state", "in", ("queued", "in_flight")),
+        ])
+        pending = moves - open_jobs.move_id
+        jobs = self.create([{
+            "move_id": move.id,
+            "job_type": job_type,
+            "note": notes.get(move.id, False),
+        } for move in pending])
+        if jobs:
+            cron = self.env.ref("eims_test_connector_12.ir_cron_eims_submission_queue", raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+        return jobs
+
+    def action_retry(self):
+        self.filtered(lambda job: job.state == "failed").write({
+            "state": "queued",
+            "last_error": False,
+        })
+        cron = self.env.ref("eims_test_connector_12.ir_cron_eims_submission_queue", raise_if_not_found=False)
+        if cron:
+            cron._trigger()
+
+    # -------------------------------------------------------------------------
+    # Dispatcher
+    # -------------------------------------------------------------------------
+    def _get_queue_param(self, key, default):
+        value = self.env["ir.config_parameter"].sudo().get_param(key)
+        try:
+            return int(value) if value else default
+        except ValueError:
+            return default
+
+    @api.model
+    def _claim_jobs(self, limit):
+        """
+        Atomically move up to `limit` queued jobs to in_flight and commit.
+        SKIP LOCKED lets several dispatchers drain the queue side by side
+        without ever picking up the same job twice.
+        """
+        self.env.cr.execute("""
+            UPDATE eims_submission_queue
+               SET state = 'in_flight',
+                   attempts = attempts + 1,
+                   date_started = now() AT TIME ZONE 'UTC',
+                   write_date = now() AT TIME ZONE 'UTC'
+             WHERE id IN (
+                    SELECT id FROM eims_submission_queue
+                     WHERE state = 'queued'
+                     ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED)
+         RETURNING id
+        """, [limit])
+        job_ids = sorted(row[0] for row in self.env.cr.fetchall())
+        self.env.cr.commit()
+        self.invalidate_model(["state", "attempts", "date_started"])
+        return self.browse(job_ids)
+
+    @api.model
+    def _fail_stale_jobs(self):
+        """
+        Jobs left in_flight by a dead worker are not resent blindly: the
+        invoice may have been registered before the worker died, so they
+        are marked failed for a manual retry (which verifies first).
+        """
+        minutes = self._get_queue_param("eims.queue_stale_minutes", QUEUE_STALE_MINUTES)
+        stale = self.search([
+            ("state", "=", "in_flight"),
+            ("date_started", "<", fields.Datetime.now() - timedelta(minutes=minutes)),
+        ])
+        if stale:
+            stale.write({
+                "state": "failed",
+                "last_error": "Interrupted while in flight, please retry.",
+            })
+            _logger.warning("[EIMS] %s stale submission job(s) marked as failed", len(stale))
+
+    @api.model
+    def _cron_process_queue(self):
+        self._fail_stale_jobs()
+        self.env.cr.commit()
+
+        batch_size = self._get_queue_param("eims.queue_batch_size", QUEUE_BATCH_SIZE)
+        deadline = time.monotonic() + self._get_queue_param("eims.queue_time_budget", QUEUE_TIME_BUDGET)
+
+        while time.monotonic() < deadline:
+            jobs = self._claim_jobs(batch_size)
+            if not jobs:
+                return
+            jobs._process_jobs()
+
+        # Time budget spent with work left: run again right away
+        if self.search_count([("state", "=", "queued")], limit=1):
+            self.env.ref("eims_test_connector_12.ir_cron_eims_submission_queue")._trigger()
+
+    def _process_jobs(self):
+        """
+        Run claimed jobs by type and company as batches: the MoR round trips
+        overlap (see account.move.send_to_eims_batch / verify_eims_batch)
+        and the results are committed in groups. The cron user's company
+        is not the invoices' one: each batch runs in its own company so the
+        seller details and the invoice counter are the right ones.
+        """
+        for job_type in ("register", "verify"):
+            for company in self.company_id:
+                jobs = self.filtered(lambda job: job.job_type == job_type and job.company_id == company)
+                if jobs:
+                    jobs._run_batch(job_type)
+
+    def _run_batch(self, job_type):
+        moves = self.move_id.with_company(self.company_id)
+        irn_before = {move.id: move.eims_irn for move in moves}
+        try:
+            for job in self.filtered("note"):
+                job.move_id.message_post(body=job.note)
+                job.note = False
+            if job_type == "verify":
+                outcomes = moves.verify_eims_batch()
+            else:
+                outcomes = moves.send_to_eims_batch()
+        except Exception as e:
+            # Drop the uncommitted part; what was committed before the error
+            # (IRNs included) tells which jobs actually went through
+            self.env.cr.rollback()
+            _logger.warning("[EIMS] %s batch failed: %s", job_type, e)
+            self.env.invalidate_all()
+            outcomes = {
+                move.id: (True, move.eims_irn) if move._is_eims_job_done(job_type, irn_before[move.id])
+                else (False, str(e))
+                for move in moves
+            }
+
+        now = fields.Datetime.now()
+        done = self.filtered(lambda job: outcomes.get(job.move_id.id, (False,))[0])
+        done.write({"state": "done", "date_done": now, "last_error": False})
+        for job in self - done:
+            job.write({
+                "state": "failed",
+                "date_done": now,
+                "last_error": outcomes.get(job.move_id.id, (False, "Not processed."))[1],
+            })
+        self.env.cr.commit()
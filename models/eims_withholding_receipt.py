@@ -5,7 +5,7 @@ import json
 import requests
 from odoo.exceptions import UserError
 from datetime import datetime
-from ..services.crypto_utils import sign_eims_request
+from ..services.eims_request import build_eims_request
 
 
 
@@ -189,8 +189,8 @@ class EimsWithholdingReceipt(models.Model):
         }
         payload = {"irn": self.invoice_irn}
         try:
-            signed_payload = sign_eims_request(payload)
-            resp = http.post(url_verify, json=signed_payload, headers=headers, timeout=(5, 30))
+            request_body = build_eims_request(payload)
+            resp = http.post(url_verify, data=request_body, headers=headers, timeout=(5, 30))
             resp.raise_for_status()
             data = resp.json()
             self.verification_response = json.dumps(data, default=str)
@@ -297,8 +297,8 @@ class EimsWithholdingReceipt(models.Model):
 
         try:
             #  SIGN request (service layer)
-            signed_payload = sign_eims_request(payload)
-            resp = http.post(url_submit, json=signed_payload, headers=headers, timeout=(5, 30))
+            request_body = build_eims_request(payload)
+            resp = http.post(url_submit, data=request_body, headers=headers, timeout=(5, 30))
             resp.raise_for_status()
             data = resp.json()
             self.submission_response = json.dumps(data, default=str)
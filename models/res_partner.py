@@ -1,4 +1,5 @@
 from odoo import models, fields
+from odoo.exceptions import UserError
 
 class ResPartner(models.Model):
     _inherit = 'res.partner'
@@ -15,3 +16,17 @@ class ResPartner(models.Model):
     # eims_kebele = fields.Char(string="Kebele")
     eims_wereda = fields.Char(string="Wereda")
     eims_buyers_city_code = fields.Char(string="Buyer City Code")
+
+    def action_create_eims_receipts(self):
+        """Customer statement: EIMS receipts for every payment of an EIMS invoice still without one."""
+        invoices = self.env['account.move'].search([
+            ('commercial_partner_id', 'in', self.commercial_partner_id.ids),
+            ('move_type', '=', 'out_invoice'),
+            ('state', '=', 'posted'),
+            ('eims_irn', '!=', False),
+            ('eims_status', '!=', 'cancelled'),
+            ('payment_state', 'in', ('paid', 'in_payment', 'partial')),
+        ], order='invoice_date, id')
+        if not invoices:
+            raise UserError("No paid EIMS invoices for this customer.")
+        return invoices.action_create_eims_receipts_batch()
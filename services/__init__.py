@@ -1,2 +1,6 @@
 from . import crypto_utils
-from . import eims_request
\ No newline at end of file
+from . import eims_request
+from . import eims_valuation
+from . import eims_verify_cache
+from . import eims_body_mapper
+from . import json_stream
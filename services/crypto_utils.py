@@ -1,53 +1,369 @@
 import json
 import base64
+import datetime
+import decimal
+import enum
+import hashlib
+import logging
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 from odoo.modules.module import get_module_resource
 from odoo.exceptions import UserError
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_logger = logging.getLogger(__name__)
+
+MODULE_NAME = "eims_test_connector_12"
+PRIVATE_KEY_FILE = "private_key.key"
+CERTIFICATE_FILE = "0054835018-3142D2B84A.pem"
+
+# Process-level cache: path -> (mtime_ns, value). Entries are reloaded only
+# when the file on disk changes.
+_KEY_CACHE = {}
+_CERT_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+_CERT_PATHS = []
+
+# PKCS#1 v1.5 signatures are deterministic, so the signature of identical
+# canonical bytes can be reused (retries, re-sends, repeated verifies).
+# Keyed by (key file mtime, SHA-256 of the signed bytes), least recently
+# used entries are evicted first.
+SIGNATURE_CACHE_SIZE = 1024
+_SIGNATURE_CACHE = OrderedDict()
+_SIGNATURE_CACHE_LOCK = threading.Lock()
+
+
+def _get_cert_paths():
+    if _CERT_PATHS:
+        return _CERT_PATHS[0]
+
+    private_key_path = get_module_resource(MODULE_NAME, "static", "certs", PRIVATE_KEY_FILE)
+    cert_path = get_module_resource(MODULE_NAME, "static", "certs", CERTIFICATE_FILE)
+
+    if not private_key_path or not cert_path:
+        raise UserError("EIMS certificate files not found.")
+    _CERT_PATHS[:] = [(private_key_path, cert_path)]
+    return private_key_path, cert_path
+
+
+def _load_cached(cache, path, loader):
+    mtime = os.stat(path).st_mtime_ns
+    cached = cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with _CACHE_LOCK:
+        cached = cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            value = loader(f.read())
+        cache[path] = (mtime, value)
+        return value
+
+
+def get_private_key():
+    """Return the parsed signing key, parsing the PEM only when it changes."""
+    private_key_path, _cert_path = _get_cert_paths()
+    return _load_cached(
+        _KEY_CACHE, private_key_path,
+        lambda data: serialization.load_pem_private_key(data, password=None)
+    )
+
+
+def _get_private_key_entry():
+    """Return (mtime_ns, key) so cached signatures can be tied to the key version."""
+    private_key = get_private_key()
+    private_key_path, _cert_path = _get_cert_paths()
+    return _KEY_CACHE[private_key_path][0], private_key
+
+
+def get_certificate_b64():
+    """Return the certificate file as the base64 string EIMS expects."""
+    _private_key_path, cert_path = _get_cert_paths()
+    return _load_cached(
+        _CERT_CACHE, cert_path,
+        lambda data: base64.b64encode(data).decode()
+    )
+
+
+# ---------------------------------------------------------------------------
+# Canonical JSON encoders
+#
+# The stdlib encoder defines the canonical form. A faster backend is used
+# only if it produces byte-identical output for everything in
+# CANONICAL_JSON_CORPUS; otherwise the signatures would change.
+# ---------------------------------------------------------------------------
+
+# orjson writes floats below 1e-4 without an exponent and floats from 1e16
+# up without the "+" sign, unlike float.__repr__. Output that may contain
+# such a number (or a string that looks like one) is re-encoded with the
+# stdlib.
+_ORJSON_UNSAFE_NUMBER = re.compile(rb"[0-9]e[-0-9]|0\.0000")
+
+class _CorpusEnum(enum.Enum):
+    VALUE = "A"
+
+
+class _CorpusIntEnum(enum.IntEnum):
+    VALUE = 15
+
+
+CANONICAL_JSON_CORPUS = [
+    # Floats: amounts, rounding artefacts, exponent boundaries
+    [0.0, -0.0, 1.0, 0.1, 15.0, 0.15, 1150.5, 0.30000000000000004, 1234567.89,
+     99999999.99, 1e-4, 0.00012, 1e-05, 2.5e-07, 1e15, 1e16, 1.5e+16, 1e22,
+     5e-324, 1.7976931348623157e+308],
+    # Integers, including one beyond 64 bits
+    [0, -1, 15, 2 ** 53, 2 ** 63 - 1, -2 ** 63, 2 ** 70],
+    # Unicode: Amharic names, non-BMP, escapes and separators
+    {"LegalName": "አበበ በቀለ ትሬዲንግ", "City": "አዲስ አበባ", "Wereda": "ቦሌ"},
+    ["emoji 😀", "quote \" backslash \\ slash /", "\n\t\r\b\f", "\x00\x1f\x7f",
+     "\u2028\u2029", "é ñ ü", "1e16 0.00001"],
+    # Key order is preserved, not sorted
+    {"b": 1, "a": 2, "Z": 3, "ሀ": 4, "_": None, "": True, "c": False},
+    # Shape of a real request
+    {
+        "BuyerDetails": {"LegalName": "ሰላም ኃ.የተ.የግ.ማ", "Tin": None, "IdType": "KID"},
+        "DocumentDetails": {"DocumentNumber": 41, "Date": "01-01-2025T00:00:00", "Type": "INV"},
+        "ItemList": [
+            {"Discount": 0.0, "PreTaxValue": 1000.0, "Quantity": 2.5, "LineNumber": 1,
+             "TaxAmount": 150.0, "TaxCode": "VAT15", "TotalLineAmount": 1150.0,
+             "ProductDescription": "ቡና 1kg", "UnitPrice": 400.0, "ExciseTaxValue": 0.0},
+        ] * 3,
+        "ValueDetails": {"Discount": 0.0, "TaxValue": 450.0, "TotalValue": 3450.0},
+        "Version": "1",
+    },
+    # Non-string keys are coerced to strings by the stdlib
+    {1: "one", 2.5: "two and a half", None: "none", False: "false"},
+    # Non-finite floats: the stdlib writes NaN/Infinity, orjson writes null
+    [float("nan"), float("inf"), float("-inf"), None],
+    {"ValueDetails": {"TotalValue": float("nan"), "TaxValue": None}, "ItemList": [{"UnitPrice": float("-inf")}]},
+    # Types orjson serializes natively but the stdlib rejects: both must fail
+    {"Date": datetime.date(2025, 1, 1)},
+    [datetime.datetime(2025, 1, 1, 12, 30, tzinfo=datetime.timezone.utc)],
+    {"Irn": uuid.UUID("12345678-1234-5678-1234-567812345678")},
+    [decimal.Decimal("1150.50")],
+    [_CorpusEnum.VALUE],
+    # Subclasses of str and int: the stdlib writes their value
+    [_CorpusIntEnum.VALUE, True, False],
+]
+
+
+def _stdlib_canonical_json(payload) -> bytes:
+    return json.dumps(
+        payload,
+        separators=(",", ":"),
+        ensure_ascii=False
+    ).encode("utf-8")
+
+
+# Dates, dataclasses and subclasses of builtin types go through `default`,
+# which refuses them, so they are left to the stdlib like any other type it
+# does not know.
+_ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS
+    if orjson is not None else 0
+)
+
+
+def _orjson_refuse(value):
+    raise TypeError(f"{type(value).__name__} is left to the stdlib encoder")
+
+
+def _has_non_plain_value(payload) -> bool:
+    """
+    True if `payload` holds anything else than dicts, lists, tuples, str,
+    int, bool, None and finite floats: orjson writes NaN and +/-Infinity as
+    null and serializes UUIDs and enums natively, without any option to
+    hand them back, where the stdlib writes NaN/Infinity or raises.
+    """
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        value_type = type(value)
+        if value_type is dict:
+            stack.extend(value.values())
+        elif value_type is list or value_type is tuple:
+            stack.extend(value)
+        elif value_type is float:
+            if value - value != 0:  # NaN or +/-Infinity
+                return True
+        elif value_type is not str and value_type is not int and value_type is not bool and value is not None:
+            return True
+    return False
+
+
+def _orjson_canonical_json(payload) -> bytes:
+    try:
+        serialized = orjson.dumps(payload, default=_orjson_refuse, option=_ORJSON_OPTIONS)
+    except TypeError:
+        # Non-str keys, integers beyond 64 bits, lone surrogates, dates...
+        return _stdlib_canonical_json(payload)
+    if _ORJSON_UNSAFE_NUMBER.search(serialized) or _has_non_plain_value(payload):
+        return _stdlib_canonical_json(payload)
+    return serialized
+
+
+JSON_BACKENDS = {"stdlib": _stdlib_canonical_json}
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = _orjson_canonical_json
+
+_JSON_BACKEND = {"name": "stdlib", "encode": _stdlib_canonical_json}
+
+
+def _encode_outcome(encode, sample):
+    try:
+        return encode(sample)
+    except Exception as e:
+        return type(e)
+
+
+def check_json_backend(encode) -> list:
+    """
+    Return the corpus entries for which `encode` differs from the stdlib,
+    in output or in the error raised.
+    """
+    return [
+        sample for sample in CANONICAL_JSON_CORPUS
+        if _encode_outcome(encode, sample) != _encode_outcome(_stdlib_canonical_json, sample)
+    ]
+
+
+def set_json_backend(name) -> bool:
+    """
+    Switch the canonical JSON encoder. The backend is only accepted when it
+    is byte-identical to the stdlib on CANONICAL_JSON_CORPUS.
+    """
+    encode = JSON_BACKENDS.get(name)
+    if encode is None:
+        _logger.warning("[EIMS] JSON backend %s is not available", name)
+        return False
+    mismatches = check_json_backend(encode)
+    if mismatches:
+        _logger.warning("[EIMS] JSON backend %s rejected, output differs for: %r", name, mismatches)
+        return False
+    _JSON_BACKEND.update({"name": name, "encode": encode})
+    return True
+
+
+def get_json_backend() -> str:
+    return _JSON_BACKEND["name"]
+
+
+def canonical_json(payload) -> bytes:
+    """Canonical JSON bytes that are signed (NO pretty print, NO spaces)."""
+    return _JSON_BACKEND["encode"](payload)
+
+
+if "orjson" in JSON_BACKENDS:
+    set_json_backend("orjson")
+
+
+def sign_bytes(serialized: bytes) -> str:
+    """SHA512withRSA signature of already serialized bytes, base64 encoded."""
+    key_version, private_key = _get_private_key_entry()
+    cache_key = (key_version, hashlib.sha256(serialized).digest())
+
+    with _SIGNATURE_CACHE_LOCK:
+        signature_b64 = _SIGNATURE_CACHE.get(cache_key)
+        if signature_b64 is not None:
+            _SIGNATURE_CACHE.move_to_end(cache_key)
+            return signature_b64
+
+    signature = private_key.sign(
+        serialized,
+        padding.PKCS1v15(),
+        hashes.SHA512()
+    )
+    signature_b64 = base64.b64encode(signature).decode()
+
+    with _SIGNATURE_CACHE_LOCK:
+        _SIGNATURE_CACHE[cache_key] = signature_b64
+        _SIGNATURE_CACHE.move_to_end(cache_key)
+        while len(_SIGNATURE_CACHE) > SIGNATURE_CACHE_SIZE:
+            _SIGNATURE_CACHE.popitem(last=False)
+    return signature_b64
+
+
+def clear_signature_cache():
+    with _SIGNATURE_CACHE_LOCK:
+        _SIGNATURE_CACHE.clear()
+
+
+def build_signed_body(request_payload) -> bytes:
+    """
+    Build the final MoR request body in a single serialization pass.
+    The canonical bytes that are signed are spliced verbatim into the
+    envelope, so the server receives exactly what was signed.
+    """
+    try:
+        serialized = canonical_json(request_payload)
+        signature_b64 = sign_bytes(serialized)
+        cert_b64 = get_certificate_b64()
+    except Exception as e:
+        raise UserError(f"EIMS Signing Failed: {str(e)}")
+
+    # base64 never needs JSON escaping, so plain concatenation is valid JSON
+    return b"".join((
+        b'{"request":', serialized,
+        b',"signature":"', signature_b64.encode("ascii"),
+        b'","certificate":"', cert_b64.encode("ascii"),
+        b'"}',
+    ))
+
+
+def sign_many(payloads, max_workers=None) -> list:
+    """
+    Build signed request bodies (see build_signed_body) for many payloads,
+    returned in the same order as `payloads`.
+
+    Signing is fanned out over a thread pool sharing the cached key, so the
+    RSA operations overlap wherever the crypto backend releases the GIL.
+    A process pool is not used: forking an Odoo worker is unsafe and
+    parsed keys cannot be pickled.
+    """
+    payloads = list(payloads)
+    if max_workers is None:
+        max_workers = min(len(payloads), os.cpu_count() or 1)
+    if len(payloads) < 2 or max_workers < 2:
+        return [build_signed_body(payload) for payload in payloads]
+
+    # Warm the key/certificate cache once instead of in every thread
+    try:
+        get_private_key()
+        get_certificate_b64()
+    except Exception as e:
+        raise UserError(f"EIMS Signing Failed: {str(e)}")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eims-sign") as executor:
+        return list(executor.map(build_signed_body, payloads))
+
+
 def sign_eims_request(request_payload: dict) -> dict:
     """
     Sign ONLY the inner request payload using SHA512withRSA
+
+    Prefer build_signed_body(), which avoids serializing the payload a
+    second time when the request is posted.
     """
 
     try:
-        private_key_path = get_module_resource(
-            "eims_test_connector_12", "static", "certs", "private_key.key"
-        )
-        cert_path = get_module_resource(
-            "eims_test_connector_12", "static", "certs", "0054835018-3142D2B84A.pem"
-        )
-
-        if not private_key_path or not cert_path:
-            raise UserError("EIMS certificate files not found.")
-
-        # 1️⃣ Canonical JSON (NO pretty print, NO spaces)
-        serialized = json.dumps(
-            request_payload,
-            separators=(",", ":"),
-            ensure_ascii=False
-        ).encode("utf-8")
-
-        # 2️⃣ Load private key
-        with open(private_key_path, "rb") as f:
-            private_key = serialization.load_pem_private_key(
-                f.read(),
-                password=None
-            )
-
-        # 3️⃣ Sign
-        signature = private_key.sign(
-            serialized,
-            padding.PKCS1v15(),
-            hashes.SHA512()
-        )
-
-        # 4️⃣ Base64 encode
-        signature_b64 = base64.b64encode(signature).decode()
-
-        # 5️⃣ Certificate MUST be base64 (NOT raw PEM)
-        with open(cert_path, "rb") as f:
-            cert_b64 = base64.b64encode(f.read()).decode()
+        serialized = canonical_json(request_payload)
+        signature_b64 = sign_bytes(serialized)
+
+        # Certificate MUST be base64 (NOT raw PEM)
+        cert_b64 = get_certificate_b64()
 
         return {
             "request": request_payload,
@@ -56,4 +372,4 @@ def sign_eims_request(request_payload: dict) -> dict:
         }
 
     except Exception as e:
-        raise UserError(f"EIMS Signing Failed: {str(e)}")
\ No newline at end of file
+        raise UserError(f"EIMS Signing Failed: {str(e)}")
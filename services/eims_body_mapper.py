@@ -0,0 +1,258 @@
+"""
+Declarative mapping of EIMS response bodies onto record fields.
+
+A FieldMap is built once from (field, "Section.Key") rules. Values are
+converted according to the type of the target field and only the values
+that differ from the record are written, in a single write() call.
+"""
+import logging
+from collections import namedtuple
+from datetime import date, datetime
+
+_logger = logging.getLogger(__name__)
+
+EIMS_DATETIME_FORMATS = ("%d-%m-%YT%H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+# keep_missing: leave the field untouched when the path is absent
+Rule = namedtuple('Rule', ['field', 'path', 'keep_missing'], defaults=[False])
+
+_MISSING = object()
+
+
+def parse_eims_datetime(value):
+    """EIMS dates come as DD-MM-YYYYTHH:MM:SS or ISO, possibly with a zone suffix."""
+    if not value:
+        return False
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    clean = str(value).split('Z')[0].split('[')[0].split('.')[0]
+    for fmt in EIMS_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(clean, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unsupported EIMS date {value!r}")
+
+
+def _to_text(value):
+    return str(value) if value else ""
+
+
+def _to_date(value):
+    value = parse_eims_datetime(value)
+    return value.date() if value else False
+
+
+CONVERTERS = {
+    'char': _to_text,
+    'text': _to_text,
+    'html': _to_text,
+    'selection': lambda value: value or False,
+    'float': lambda value: float(value or 0.0),
+    'monetary': lambda value: float(value or 0.0),
+    'integer': lambda value: int(value or 0),
+    'boolean': bool,
+    'datetime': parse_eims_datetime,
+    'date': _to_date,
+    'json': lambda value: value or False,
+}
+
+
+def convert(field, value):
+    """Convert a JSON value for `field` (an Odoo field object)."""
+    converter = CONVERTERS.get(field.type)
+    return converter(value) if converter else value
+
+
+def _same(current, new):
+    # False, None, "" and 0 are all "empty" for the fields mapped here
+    if not current and not new:
+        return True
+    return current == new
+
+
+def changed_values(record, values):
+    """The subset of `values` that differs from what `record` holds."""
+    record.ensure_one()
+    return {
+        name: value for name, value in values.items()
+        if not _same(record[name], value)
+    }
+
+
+def write_changed(record, values):
+    """Write only the changed `values` on `record`, in one write()."""
+    changes = changed_values(record, values)
+    if changes:
+        record.write(changes)
+    return changes
+
+
+def copy_values(source, target, names):
+    """Values of fields `names` of `source`, converted for the fields of `target`."""
+    values = {}
+    for name in names:
+        try:
+            values[name] = convert(target._fields[name], source[name])
+        except (TypeError, ValueError) as e:
+            _logger.warning("[EIMS] Cannot copy %s to %s: %s", name, target._name, e)
+    return values
+
+
+class FieldMap:
+    """Compiled list of rules mapping JSON paths of an EIMS body to fields."""
+
+    def __init__(self, rules):
+        self.rules = tuple(
+            Rule(rule.field, tuple(rule.path.split('.')), rule.keep_missing)
+            for rule in (Rule(*rule) for rule in rules)
+        )
+        self.field_names = tuple(rule.field for rule in self.rules)
+
+    @staticmethod
+    def _resolve(body, path):
+        value = body
+        for key in path:
+            if not isinstance(value, dict):
+                return _MISSING
+            value = value.get(key, _MISSING)
+            if value is _MISSING:
+                return _MISSING
+        return value
+
+    def values(self, record, body):
+        """Converted {field: value} for `body`, typed after the fields of `record`."""
+        model_fields = record._fields
+        values = {}
+        for name, path, keep_missing in self.rules:
+            value = self._resolve(body or {}, path)
+            if value is _MISSING:
+                if keep_missing:
+                    continue
+                value = None
+            try:
+                values[name] = convert(model_fields[name], value)
+            except (TypeError, ValueError) as e:
+                _logger.warning("[EIMS] Ignoring %s=%r on %s: %s", name, value, record._name, e)
+        return values
+
+    def apply(self, record, body, extra=None):
+        """Map `body` (plus `extra` values) onto `record` with a single write."""
+        values = self.values(record, body)
+        if extra:
+            values.update(extra)
+        return write_changed(record, values)
+
+
+# Body of a successful /v1/register answer
+REGISTER_BODY_MAP = FieldMap([
+    # Buyer Details
+    ('eims_buyers_tin', 'BuyerDetails.Tin'),
+    ('eims_buyers_city_code', 'BuyerDetails.City'),
+    ('eims_buyers_region', 'BuyerDetails.Region'),
+    ('eims_buyers_wereda', 'BuyerDetails.Wereda'),
+    ('eims_buyers_vat_number', 'BuyerDetails.VatNumber'),
+    ('eims_buyers_id_type', 'BuyerDetails.IdType'),
+    ('eims_buyers_id_number', 'BuyerDetails.IdNumber'),
+    ('eims_buyers_legal_name', 'BuyerDetails.LegalName'),
+    ('eims_buyers_email', 'BuyerDetails.Email'),
+    ('eims_buyers_phone', 'BuyerDetails.Phone'),
+    # Seller Details
+    ('eims_seller_tin', 'SellerDetails.Tin'),
+    ('eims_seller_city_code', 'SellerDetails.City'),
+    ('eims_seller_region', 'SellerDetails.Region'),
+    ('eims_seller_wereda', 'SellerDetails.Wereda'),
+    ('eims_seller_legal_name', 'SellerDetails.LegalName'),
+    ('eims_seller_email', 'SellerDetails.Email'),
+    ('eims_seller_phone', 'SellerDetails.Phone'),
+    ('eims_seller_tax_center', 'SellerDetails.TaxCenter'),
+    ('eims_seller_vat_number', 'SellerDetails.VatNumber'),
+    ('eims_seller_house_number', 'SellerDetails.HouseNumber'),
+    ('eims_seller_locality', 'SellerDetails.Locality'),
+    # Value Details
+    ('eims_total_value', 'ValueDetails.TotalValue'),
+    ('eims_tax_value', 'ValueDetails.TaxValue'),
+    ('eims_invoice_currency', 'ValueDetails.InvoiceCurrency'),
+    # Payment Details
+    ('eims_payment_mode', 'PaymentDetails.Mode'),
+    ('eims_payment_term', 'PaymentDetails.PaymentTerm'),
+    # Source System
+    ('eims_source_system', 'SourceSystem.SystemType'),
+    ('eims_cashier_name', 'SourceSystem.CashierName'),
+    ('eims_system_number', 'SourceSystem.SystemNumber'),
+    ('eims_invoice_counter', 'SourceSystem.InvoiceCounter'),
+    ('eims_sales_person_name', 'SourceSystem.SalesPersonName'),
+    # Document Details
+    ('eims_document_number', 'DocumentDetails.DocumentNumber'),
+    ('eims_document_type', 'DocumentDetails.Type'),
+    ('eims_document_reason', 'DocumentDetails.Reason'),
+    ('eims_document_date', 'DocumentDetails.Date', True),
+    # Transaction type and reference details sit at the root of the body
+    ('eims_transaction_type', 'TransactionType'),
+    ('eims_previous_irn', 'ReferenceDetails.PreviousIrn'),
+    ('eims_related_document', 'ReferenceDetails.RelatedDocument'),
+])
+
+# Body of a successful /v1/verify answer
+VERIFY_BODY_MAP = FieldMap([
+    # Document Details
+    ('eims_document_number', 'DocumentDetails.DocumentNumber'),
+    ('eims_document_date', 'DocumentDetails.Date'),
+    ('eims_document_details', 'DocumentDetails.DocumentDetails'),
+    ('eims_document_type', 'DocumentDetails.Type'),
+    ('eims_document_reason', 'DocumentDetails.Reason'),
+    # Value Details
+    ('eims_total_value', 'ValueDetails.TotalValue'),
+    ('eims_tax_value', 'ValueDetails.TaxValue'),
+    ('eims_invoice_currency', 'ValueDetails.InvoiceCurrency'),
+    # Buyer Details
+    ('eims_buyers_tin', 'BuyerDetails.Tin'),
+    ('eims_buyers_city_code', 'BuyerDetails.City'),
+    ('eims_buyers_region', 'BuyerDetails.Region'),
+    ('eims_buyers_wereda', 'BuyerDetails.Wereda'),
+    ('eims_buyers_id_type', 'BuyerDetails.IdType'),
+    ('eims_buyers_id_number', 'BuyerDetails.IdNumber'),
+    ('eims_buyers_legal_name', 'BuyerDetails.LegalName'),
+    ('eims_buyers_email', 'BuyerDetails.Email'),
+    ('eims_buyers_phone', 'BuyerDetails.Phone'),
+    # Source System
+    ('eims_source_system', 'SourceSystem.SourceSystem'),
+    ('eims_cashier_name', 'SourceSystem.CashierName'),
+    ('eims_system_number', 'SourceSystem.SystemNumber'),
+    ('eims_invoice_counter', 'SourceSystem.InvoiceCounter'),
+    ('eims_sales_person_name', 'SourceSystem.SalesPersonName'),
+    # Seller Details
+    ('eims_seller_tin', 'SellerDetails.Tin'),
+    ('eims_seller_city_code', 'SellerDetails.City'),
+    ('eims_seller_region', 'SellerDetails.Region'),
+    ('eims_seller_wereda', 'SellerDetails.Wereda'),
+    ('eims_seller_legal_name', 'SellerDetails.LegalName'),
+    ('eims_seller_email', 'SellerDetails.Email'),
+    ('eims_seller_phone', 'SellerDetails.Phone'),
+    # Payment Details
+    ('eims_payment_mode', 'PaymentDetails.PaymentMode'),
+    ('eims_payment_term', 'PaymentDetails.PaymentTerm'),
+    # Transaction Details
+    ('eims_transaction_type', 'TransactionDetails.TransactionType'),
+    ('eims_reference_details', 'TransactionDetails.ReferenceDetails'),
+    ('eims_previous_irn', 'TransactionDetails.PreviousIRN'),
+])
+
+# Invoice fields mirrored on eims.registered.invoice / eims.credit.memo.log
+# once the invoice is verified
+VERIFIED_LOG_FIELDS = (
+    'eims_status', 'eims_document_number', 'eims_document_date', 'eims_verified_data',
+    'eims_qr_code', 'eims_signed_invoice',
+    'eims_total_value', 'eims_tax_value', 'eims_invoice_currency',
+    'eims_buyers_id_number', 'eims_buyers_legal_name', 'eims_buyers_email', 'eims_buyers_phone',
+    'eims_buyers_tin', 'eims_buyers_city_code', 'eims_buyers_region', 'eims_buyers_wereda',
+    'eims_seller_legal_name', 'eims_seller_email', 'eims_seller_phone', 'eims_seller_tin',
+    'eims_seller_city_code', 'eims_seller_region', 'eims_seller_wereda', 'eims_seller_tax_center',
+    'eims_seller_vat_number', 'eims_seller_house_number', 'eims_seller_locality',
+    'eims_payment_mode', 'eims_payment_term',
+    'eims_source_system', 'eims_cashier_name', 'eims_system_number', 'eims_invoice_counter',
+    'eims_sales_person_name', 'eims_document_type', 'eims_document_reason',
+    'eims_transaction_type', 'eims_reference_details', 'eims_previous_irn',
+)
@@ -1,19 +1,13 @@
-import base64
-from .crypto_utils import sign_eims_request
+from .crypto_utils import build_signed_body
 
 
-def build_eims_request(payload: dict, cert_path: str, private_key_path: str) -> dict:
+def build_eims_request(payload) -> bytes:
     """
     Builds final MoR compliant request
-    """
-
-    signature = sign_eims_request(payload, private_key_path)
 
-    with open(cert_path, "rb") as cert_file:
-        certificate_base64 = base64.b64encode(cert_file.read()).decode("utf-8")
+    Returns the JSON body as bytes, ready to be posted with ``data=``:
+    the payload is serialized exactly once and that same byte string is
+    both signed and sent.
+    """
 
-    return {
-        "request": payload,
-        "signature": signature,
-        "certificate": certificate_base64
-    }
\ No newline at end of file
+    return build_signed_body(payload)
@@ -0,0 +1,135 @@
+"""
+EIMS line valuation engine.
+
+Shared by the invoice and credit memo payload builders. Lines are valued in
+one batch call over plain values (no ORM access), using exactly the same
+Decimal operations, in the same order, as the original per-line code, so
+every amount is rounded ROUND_HALF_UP to the cent identically.
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+ONE = Decimal('1.0')
+HUNDRED = Decimal('100')
+WITHHOLDING_RATE = Decimal('0.03')
+
+# Raw values of one invoice line. `excise_rate` and `vat_rate` are percents
+# (e.g. '5' or 15.0); falsy values mean "not applicable".
+LineInput = namedtuple('LineInput', [
+    'price_subtotal', 'price_unit', 'quantity', 'discount',
+    'excise_rate', 'vat_rate', 'withholding',
+])
+
+LineValue = namedtuple('LineValue', [
+    'pre_tax', 'excise', 'vat', 'withholding', 'discount', 'total',
+])
+
+Totals = namedtuple('Totals', [
+    'discount', 'vat', 'withholding', 'excise', 'total',
+])
+
+
+def _dec(value):
+    return Decimal(str(value or 0))
+
+
+def value_lines(lines):
+    """
+    Value a batch of LineInput and return (list of LineValue, Totals).
+
+    Formulas (all amounts quantized to 0.01, ROUND_HALF_UP):
+      excise   = unit price × qty × (1 − discount%) × excise%
+      vat      = (pre-tax + excise) × VAT% + excise
+      withhold = pre-tax × 3 %                (flagged lines only)
+      discount = unit price × qty × discount%
+      total    = pre-tax + vat
+    """
+    values = []
+    total_discount = ZERO
+    total_vat = ZERO
+    total_wh = ZERO
+    total_excise = ZERO
+    total_value = ZERO
+
+    for line in lines:
+        pre_tax = Decimal(str(line.price_subtotal))  # already after discount
+        gross = _dec(line.price_unit) * _dec(line.quantity)
+        discount_rate = _dec(line.discount)
+
+        excise = ZERO
+        if line.excise_rate:
+            excise = (gross * (ONE - discount_rate / HUNDRED) * _dec(line.excise_rate) / HUNDRED).quantize(
+                CENT, ROUND_HALF_UP)
+
+        vat_rate = _dec(line.vat_rate) / HUNDRED if line.vat_rate is not None else ZERO
+        vat = ((pre_tax + excise) * vat_rate + excise).quantize(CENT, ROUND_HALF_UP)
+
+        withholding = ZERO
+        if line.withholding:
+            withholding = (pre_tax * WITHHOLDING_RATE).quantize(CENT, ROUND_HALF_UP)
+
+        discount = (gross * discount_rate / HUNDRED).quantize(CENT, ROUND_HALF_UP)
+        total = (pre_tax + vat).quantize(CENT, ROUND_HALF_UP)
+
+        total_discount += discount
+        total_vat += vat
+        total_wh += withholding
+        total_excise += excise
+        total_value += total
+
+        values.append(LineValue(pre_tax, excise, vat, withholding, discount, total))
+
+    return values, Totals(total_discount, total_vat, total_wh, total_excise, total_value)
+
+
+def _legacy_value_line(line):
+    """Verbatim per-line maths of the former payload builders (reference)."""
+    pre_tax = Decimal(str(line.price_subtotal))
+    excise_value = Decimal('0.00')
+    if line.excise_rate:
+        line_total_before_tax = (Decimal(str(line.price_unit)) * Decimal(str(line.quantity)) *
+                                 (Decimal('1.0') - Decimal(str(line.discount or 0)) / Decimal('100')))
+        excise_value = (line_total_before_tax * Decimal(str(line.excise_rate)) / Decimal('100')).quantize(
+            Decimal('0.01'), ROUND_HALF_UP)
+    vat_rate = Decimal('0.00')
+    if line.vat_rate is not None:
+        vat_rate = Decimal(str(line.vat_rate)) / Decimal('100')
+    vat_amount = ((pre_tax + excise_value) * vat_rate + excise_value).quantize(Decimal('0.01'), ROUND_HALF_UP)
+    wh_amount = Decimal('0.00')
+    if line.withholding:
+        wh_amount = (pre_tax * Decimal('0.03')).quantize(Decimal('0.01'), ROUND_HALF_UP)
+    line_discount = (Decimal(str(line.price_unit)) * Decimal(str(line.quantity)) * Decimal(
+        str(line.discount)) / Decimal('100')).quantize(Decimal('0.01'), ROUND_HALF_UP)
+    total_line = (pre_tax + vat_amount).quantize(Decimal('0.01'), ROUND_HALF_UP)
+    return LineValue(pre_tax, excise_value, vat_amount, wh_amount, line_discount, total_line)
+
+
+def _benchmark(sizes=(1, 10, 100, 1000), rounds=20):
+    """Compare value_lines() with the legacy maths: identical output and timing."""
+    import random
+    import timeit
+
+    rng = random.Random(42)
+
+    def random_line():
+        price_unit = round(rng.uniform(0.01, 50000), rng.choice((2, 3, 4)))
+        quantity = round(rng.uniform(0.5, 500), rng.choice((0, 2, 3)))
+        discount = rng.choice((0.0, 0.0, 2.5, 5.0, 10.0, 12.75))
+        subtotal = round(price_unit * quantity * (1 - discount / 100), 2)
+        return LineInput(subtotal, price_unit, quantity, discount,
+                         rng.choice(('0', '5', '10', '12', '18')),
+                         rng.choice((None, 0.0, 15.0)), rng.random() < 0.3)
+
+    for size in sizes:
+        lines = [random_line() for _i in range(size)]
+        values, _totals = value_lines(lines)
+        assert values == [_legacy_value_line(line) for line in lines], size
+        engine = timeit.timeit(lambda: value_lines(lines), number=rounds) / rounds
+        legacy = timeit.timeit(lambda: [_legacy_value_line(line) for line in lines], number=rounds) / rounds
+        print(f"{size:>5} lines: engine {engine * 1e3:8.3f} ms   legacy {legacy * 1e3:8.3f} ms   identical")
+
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,125 @@
+"""
+Short-lived, process-wide cache of EIMS verify answers.
+
+Verify calls for one IRN tend to come in bursts (verify before a resend,
+then the log and callback paths right after). Answers are kept for a few
+seconds, and concurrent lookups of the same key share a single fetch: the
+first caller runs it, the others wait for its result (or its error).
+
+The cache lives in each worker process. Keys carry a stamp of the invoices
+behind the IRN (see account.move._get_eims_verify_keys), so a change
+committed by any worker retires the answers cached by all of them;
+invalidate() only speeds this up for the worker making the change.
+"""
+import threading
+import time
+
+DEFAULT_TTL = 30  # seconds
+DEFAULT_MAX_SIZE = 2048
+# A waiter gives up on the leading fetch after this and fetches itself
+WAIT_TIMEOUT = 90
+
+
+def is_cacheable(data):
+    """Only successful MoR answers are kept; errors may be temporary."""
+    return isinstance(data, dict) and data.get("statusCode") == 200
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "stale")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.stale = False
+
+
+class VerifyCache:
+    """TTL cache with request coalescing. Keys are (dbname, irn, stamp)."""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = {}  # key -> (expires_at, data)
+        self._inflight = {}  # key -> _Call
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def _store(self, key, data, ttl):
+        # Caller holds the lock
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._entries) >= self.max_size:
+            for old_key in [k for k, (expires_at, _d) in self._entries.items() if expires_at <= now]:
+                del self._entries[old_key]
+            while len(self._entries) >= self.max_size:
+                # dicts keep insertion order: drop the oldest entry
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (now + ttl, data)
+
+    def get_or_fetch(self, key, fetch, ttl=DEFAULT_TTL):
+        """
+        Return the cached answer for `key`, or run `fetch()` once for all
+        concurrent callers. Error answers are shared with the callers
+        waiting on the same fetch but not stored.
+        """
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            if not call.event.wait(WAIT_TIMEOUT):
+                return fetch()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None and not call.stale and is_cacheable(call.result):
+                    self._store(key, call.result, ttl)
+            call.event.set()
+        return call.result
+
+    def invalidate(self, keys):
+        """Forget `keys` ((dbname, irn)) whatever their stamp, including answers still being fetched."""
+        keys = set(keys)
+        if not keys:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[:2] in keys]:
+                del self._entries[key]
+            for key, call in self._inflight.items():
+                if key[:2] in keys:
+                    call.stale = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for call in self._inflight.values():
+                call.stale = True
+
+
+VERIFY_CACHE = VerifyCache()
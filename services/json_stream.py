@@ -0,0 +1,179 @@
+"""
+Incremental parsing of a top-level JSON array.
+
+iter_json_array() reads a binary stream chunk by chunk and yields the
+array items one at a time, so memory stays bounded by one item plus one
+chunk instead of the whole document (plus its parsed copy). Bytes are
+decoded with an incremental UTF-8 decoder, so multi-byte characters split
+across chunks are handled.
+"""
+import codecs
+import json
+import re
+
+CHUNK_SIZE = 64 * 1024
+MAX_ITEM_SIZE = 32 * 1024 * 1024  # characters
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9eE+\-.]*")
+
+
+class JSONStreamError(ValueError):
+    """Malformed or oversized JSON input."""
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE, max_item_size=MAX_ITEM_SIZE):
+    """
+    Yield the items of the JSON array read from `stream` (a binary file-like
+    object). Raises JSONStreamError on malformed input or when a single
+    item is larger than `max_item_size` characters.
+    """
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill(min_size=0):
+        # Append at least one chunk (or up to `min_size` pending characters)
+        nonlocal buffer, pos, eof
+        parts = [buffer[pos:]]
+        size = len(parts[0])
+        if size > max_item_size:
+            # The pending item alone is already over the limit
+            raise JSONStreamError(f"JSON item larger than {max_item_size} characters")
+        # Never read further than the largest item allowed needs
+        min_size = min(min_size, max_item_size + chunk_size)
+        while not eof:
+            data = stream.read(chunk_size)
+            try:
+                if not data:
+                    eof = True
+                    parts.append(utf8.decode(b"", final=True))
+                else:
+                    parts.append(utf8.decode(data))
+            except UnicodeDecodeError as e:
+                raise JSONStreamError(f"Invalid UTF-8: {e}") from None
+            size += len(parts[-1])
+            if size >= min_size:
+                break
+        buffer = "".join(parts)
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return pos < len(buffer)
+            fill()
+
+    if not skip_whitespace() or buffer[pos] != "[":
+        raise JSONStreamError("Expected a JSON array")
+    pos += 1
+
+    expect_value = None  # None: first item or "]", True: item, False: "," or "]"
+    while True:
+        if not skip_whitespace():
+            raise JSONStreamError("Unexpected end of JSON input")
+        char = buffer[pos]
+
+        if char == "]" and expect_value is not True:
+            pos += 1
+            break
+        if expect_value is False:
+            if char != ",":
+                raise JSONStreamError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise JSONStreamError(f"Invalid JSON: {e}") from None
+            # Incomplete item: grow the window geometrically to keep retries cheap
+            fill(2 * (len(buffer) - pos))
+            continue
+        if not eof and _NUMBER_TAIL.match(buffer, end).end() == len(buffer):
+            # A number (or its exponent) may go on in the next chunk
+            fill(2 * (len(buffer) - pos))
+            continue
+
+        if end - pos > max_item_size:
+            raise JSONStreamError(f"JSON item larger than {max_item_size} characters")
+        pos = end
+        expect_value = False
+        yield item
+
+    if skip_whitespace():
+        raise JSONStreamError("Unexpected data after the JSON array")
+
+
+def iter_chunks(iterable, size):
+    """Group `iterable` into lists of at most `size` items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _benchmark(target_mb=50):
+    """
+    Peak memory and time of the former callback parsing (json.loads plus
+    an indented dump of the payload and of every item) versus
+    iter_json_array(), on a synthetic bulk callback of ~`target_mb` MB.
+    """
+    import base64
+    import io
+    import os
+    import time
+    import tracemalloc
+
+    blob = base64.b64encode(os.urandom(30000)).decode()
+    item_count = target_mb * 1024 * 1024 // (len(blob) + 300)
+    items = [{
+        "documentNumber": str(100000 + i),
+        "irn": f"{i:064x}",
+        "status": "A",
+        "ackDate": "2025-01-31T10:15:00.123Z",
+        "signedQR": blob[:2000],
+        "signedInvoice": blob,
+    } for i in range(item_count)]
+    raw = json.dumps(items).encode()
+    del items
+    print(f"payload: {len(raw) / 1024 / 1024:.1f} MB, {item_count} items")
+
+    def legacy():
+        payload = json.loads(raw.decode("utf-8"))
+        json.dumps(payload, indent=2)
+        for item in payload:
+            for _copy in range(3):
+                json.dumps(item, indent=2)
+        return len(payload)
+
+    def streaming():
+        count = 0
+        for chunk in iter_chunks(iter_json_array(io.BytesIO(raw)), 200):
+            for item in chunk:
+                json.dumps(item)
+                count += 1
+        return count
+
+    for name, func in (("json.loads + indent", legacy), ("iter_json_array", streaming)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        count = func()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name:>20}: {count} items  {elapsed:6.2f} s  peak {peak / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    _benchmark()
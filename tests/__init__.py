@@ -0,0 +1,2 @@
+from . import test_eims_auth_token
+from . import test_json_stream
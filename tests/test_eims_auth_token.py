@@ -0,0 +1,84 @@
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from odoo import SUPERUSER_ID, api
+from odoo.modules.registry import Registry
+from odoo.tests import BaseCase, get_db_name, tagged
+
+from odoo.addons.eims_test_connector_12.models.eims_auth import EimsAuth, _TOKEN_CACHE
+
+CLIENT_ID = "test-token-client"
+LOGIN_URL = "https://login.eims.test"
+KEY = f"{CLIENT_ID}@{LOGIN_URL}"
+
+
+@tagged('post_install', '-at_install')
+class TestEimsTokenConcurrency(BaseCase):
+    """Two workers on two cursors ask for the token while it is refreshed."""
+
+    def setUp(self):
+        super().setUp()
+        self.registry = Registry(get_db_name())
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO eims_auth_token (name, access_token, expiry) VALUES (%s, 'expired', %s)
+                ON CONFLICT (name) DO UPDATE SET access_token = EXCLUDED.access_token, expiry = EXCLUDED.expiry
+            """, (KEY, datetime.utcnow() - timedelta(minutes=1)))
+        _TOKEN_CACHE.clear()
+        self.addCleanup(self._drop_token)
+
+    def _drop_token(self):
+        _TOKEN_CACHE.clear()
+        with self.registry.cursor() as cr:
+            cr.execute("DELETE FROM eims_auth_token WHERE name = %s", (KEY,))
+
+    def _count_advisory_waiters(self):
+        with self.registry.cursor() as cr:
+            cr.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND NOT granted")
+            return cr.fetchone()[0]
+
+    def test_waiter_reuses_refreshed_token(self):
+        login_started = threading.Event()
+        release_login = threading.Event()
+        logins = []
+
+        def request_token(auth, *args):
+            logins.append(args)
+            login_started.set()
+            release_login.wait(10)
+            return "fresh", "key", datetime.utcnow() + timedelta(minutes=55)
+
+        results, errors = {}, {}
+
+        def worker(name):
+            try:
+                with self.registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    results[name] = env['eims.auth'].get_eims_token()
+            except Exception as e:
+                errors[name] = e
+
+        credentials = (CLIENT_ID, "secret", "api-key", "0000000000", LOGIN_URL)
+        with patch.object(EimsAuth, 'get_eims_credentials', lambda auth: credentials), \
+                patch.object(EimsAuth, '_request_eims_token', request_token):
+            refresher = threading.Thread(target=worker, args=("refresher",))
+            refresher.start()
+            self.assertTrue(login_started.wait(10), "the first worker never started the login")
+
+            waiter = threading.Thread(target=worker, args=("waiter",))
+            waiter.start()
+            # Let the second worker block on the lock held by the first one
+            for _i in range(100):
+                if self._count_advisory_waiters():
+                    break
+                waiter.join(0.1)
+            self.assertTrue(self._count_advisory_waiters(), "the second worker did not wait for the lock")
+
+            release_login.set()
+            refresher.join(10)
+            waiter.join(10)
+
+        self.assertFalse(errors)
+        self.assertEqual(results, {"refresher": ("fresh", "key"), "waiter": ("fresh", "key")})
+        self.assertEqual(len(logins), 1, "only the lock holder logs in")
@@ -0,0 +1,35 @@
+import io
+import json
+
+from odoo.tests import BaseCase, tagged
+
+from odoo.addons.eims_test_connector_12.services.json_stream import JSONStreamError, iter_json_array
+
+MAX_ITEM_SIZE = 1000
+CHUNK_SIZE = 64
+
+
+@tagged('post_install', '-at_install')
+class TestJsonStream(BaseCase):
+
+    def _parse(self, items):
+        stream = io.BytesIO(json.dumps(items).encode())
+        return list(iter_json_array(stream, chunk_size=CHUNK_SIZE, max_item_size=MAX_ITEM_SIZE))
+
+    def _item_of_size(self, size):
+        item = {"documentNumber": "1", "signedInvoice": ""}
+        item["signedInvoice"] = "x" * (size - len(json.dumps(item)))
+        self.assertEqual(len(json.dumps(item)), size)
+        return item
+
+    def test_items_close_to_the_limit(self):
+        items = [self._item_of_size(size) for size in (MAX_ITEM_SIZE // 2 + 1, MAX_ITEM_SIZE - 1, MAX_ITEM_SIZE)]
+        self.assertEqual(self._parse(items), items)
+
+    def test_item_over_the_limit(self):
+        with self.assertRaises(JSONStreamError):
+            self._parse([self._item_of_size(100), self._item_of_size(MAX_ITEM_SIZE + 1)])
+
+    def test_numbers_split_across_chunks(self):
+        items = [1.5e-07, 123456789012345678, -0.25] * 20
+        self.assertEqual(self._parse(items), items)